@@ -18,12 +18,49 @@ from __future__ import annotations
 __version_tuple__ = (0, 4, 2)
 __version__ = '.'.join(map(str, __version_tuple__))
 
-from collections import OrderedDict
-from typing import List, Dict, Iterable, Hashable, Union, Callable
+import asyncio
+import heapq
+import inspect
+import json
+import mmap
+import pickle
+import re
+import struct
+import time
+from array import array
+from collections import OrderedDict, deque
+from itertools import chain
+from concurrent.futures import CancelledError, Executor, Future, ThreadPoolExecutor, wait
+from concurrent.futures import FIRST_COMPLETED
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+from threading import Event, RLock
+from typing import List, Dict, Iterable, Iterator, Hashable, Union, Callable, Optional
+from typing import Awaitable, Tuple, Sequence, NamedTuple, Collection, IO
 
 VertexNameT = Hashable
 PayloadT = Union[object, Callable[[], bool]]
 ClonePayloadMethodT = Callable[[PayloadT], PayloadT]
+EdgeT = Tuple[VertexNameT, VertexNameT]
+EncodePayloadMethodT = Callable[[PayloadT], Optional[bytes]]
+DecodePayloadMethodT = Callable[[bytes], PayloadT]
+WeightMethodT = Callable[['Vertex'], float]
+ProbeBatchMethodT = Callable[[List['Vertex']], Iterable[bool]]
+
+# Binary format header: magic, byte order mark, reserved, number of vertices,
+# number of edges, size of the pickled names list, size of the payloads blob.
+# The header is followed by the CSR offsets ('q') and targets ('i') arrays,
+# the names, the payload offsets ('q') and the payloads, each section aligned
+# at 8 bytes. All integers are in native byte order.
+_MAGIC = b'DEPDAG\x00\x01'
+_BYTE_ORDER_MARK = 0x01020304
+_HEADER = struct.Struct('=8sIIQQQQ')
+
+# Max number of cells of the dense reachability arrays computed at a time by
+# the sparse matrix methods of ``CompactDag``.
+_DENSE_CHUNK_CELLS = 1 << 26
+RunMethodT = Callable[[VertexNameT, Dict[VertexNameT, PayloadT]], PayloadT]
+CoroutineFactoryT = Callable[[VertexNameT, Dict[VertexNameT, PayloadT]], Awaitable[PayloadT]]
 
 
 def names_only(vertices: Iterable[Vertex]) -> Iterable[VertexNameT]:
@@ -36,22 +73,469 @@ def names_list(vertices: Iterable[Vertex]) -> List[VertexNameT]:
     return list(names_only(vertices))
 
 
+def _find_cycle(nodes: Iterable, supporters_of: Callable) -> list:
+    """Return a list of nodes forming a cycle (each node depends on the next
+    one, the last one depends on the first one) or an empty list if there is
+    no cycle reachable from ``nodes``. Iterative three-colour depth-first
+    search, visiting each node and each edge once.
+    """
+    done = set()
+    for root in nodes:
+        if root in done:
+            continue
+        path, on_path = [root], {root}
+        stack = [iter(supporters_of(root))]
+        while stack:
+            for node in stack[-1]:
+                if node in on_path:
+                    return path[path.index(node):]
+                if node not in done:
+                    path.append(node)
+                    on_path.add(node)
+                    stack.append(iter(supporters_of(node)))
+                    break
+            else:
+                stack.pop()
+                node = path.pop()
+                on_path.discard(node)
+                done.add(node)
+    return []
+
+
+def _walk(node, neighbours_of: Callable, unique: bool = False) -> Iterator:
+    """Yield all neighbours of ``node``, retrieved recursively: the direct
+    neighbours of a node are yielded first, then those of each of them in
+    turn. Walks the graph with an explicit stack. With ``unique`` each
+    neighbour is yielded and expanded only once, keeping the order of first
+    occurrences.
+    """
+    yielded, expanded = set(), {node}
+    stack = []
+    while node is not None:
+        children = neighbours_of(node)
+        for child in children:
+            if unique:
+                if child in yielded:
+                    continue
+                yielded.add(child)
+            yield child
+        stack.append(iter(children))
+        node = _next_to_expand(stack, expanded if unique else None)
+
+
+def _search(node, neighbours_of: Callable, within: Callable) -> dict:
+    """Return a dict mapping ``node`` and the nodes reachable from it along
+    ``neighbours_of``, through nodes for which ``within(node)`` is true, to
+    the node each one has been reached from (``None`` for ``node``)."""
+    parents, stack = {node: None}, [node]
+    while stack:
+        parent = stack.pop()
+        for child in neighbours_of(parent):
+            if child not in parents and within(child):
+                parents[child] = parent
+                stack.append(child)
+    return parents
+
+
+def _next_to_expand(stack: list, expanded: Optional[set]):
+    """Pop exhausted iterators off ``stack`` and return the next node to be
+    expanded, skipping those in ``expanded`` (if given), or ``None``."""
+    while stack:
+        for node in stack[-1]:
+            if expanded is None:
+                return node
+            if node not in expanded:
+                expanded.add(node)
+                return node
+        stack.pop()
+    return None
+
+
+def _levels(nodes: list, supporters_of: Callable, dependants_of: Callable) -> Optional[list]:
+    """Return ``nodes`` grouped into lists by their distance from the farthest
+    supporter (Kahn's algorithm), keeping the given order within each group.
+    Neighbours not in ``nodes`` are ignored. Return ``None`` if there is a
+    cycle among ``nodes``.
+    """
+    pending = {node: 0 for node in nodes}
+    for node in nodes:
+        pending[node] = sum(1 for supporter in supporters_of(node) if supporter in pending)
+    level = {node: 0 for node in nodes if not pending[node]}
+    queue = list(level)
+    for node in queue:
+        for dependant in dependants_of(node):
+            if dependant not in pending:
+                continue
+            level[dependant] = max(level.get(dependant, 0), level[node] + 1)
+            pending[dependant] -= 1
+            if not pending[dependant]:
+                queue.append(dependant)
+    if len(queue) < len(nodes):
+        return None
+    result = [[] for _ in range(max(level.values(), default=-1) + 1)]
+    for node in nodes:
+        result[level[node]].append(node)
+    return result
+
+
+def _redundant_edges(order: list, supporters_of: Callable,
+                     dependants_count: Callable) -> Iterator[tuple]:
+    """Yield the ``(node, supporter)`` edges implied by others, i.e. to a
+    supporter which is also an indirect supporter of the node, for the nodes
+    in given topological ``order``.
+
+    The indirect supporters of each node are kept as a bitset (an ``int``)
+    indexed by topological position, built from those of its supporters and
+    released once all its dependants have been visited.
+    """
+    position = {node: idx for idx, node in enumerate(order)}
+    pending = {node: dependants_count(node) for node in order}
+    reach = {}
+    for node in order:
+        supporters = supporters_of(node)
+        indirect = 0
+        for supporter in supporters:
+            indirect |= reach[supporter]
+        for supporter in supporters:
+            if indirect >> position[supporter] & 1:
+                yield node, supporter
+        for supporter in supporters:
+            indirect |= 1 << position[supporter]
+            pending[supporter] -= 1
+            if not pending[supporter]:
+                del reach[supporter]
+        if pending[node]:
+            reach[node] = indirect
+
+
+def _numpy_and_sparse():
+    """Import and return ``numpy`` and ``scipy.sparse``, needed by the
+    sparse matrix methods of ``CompactDag`` (the ``numpy`` extra)."""
+    try:
+        import numpy
+        from scipy import sparse
+    except ImportError as exc:
+        raise ImportError("numpy and scipy are required, "
+                          "install them via 'pip install depdag[numpy]'") from exc
+    return numpy, sparse
+
+
+def _shared_memory():
+    """Import and return ``multiprocessing.shared_memory``, needed by
+    ``share()`` and ``SharedDag``, which is new in Python 3.8."""
+    try:
+        from multiprocessing import shared_memory
+    except ImportError as exc:
+        raise ImportError("sharing a dag requires Python 3.8 or later") from exc
+    return shared_memory
+
+
+def _reach(start, adjacency):
+    """Return a dense boolean array having set the nodes reachable, in zero
+    or more steps along ``adjacency``, from the nodes set in each row of
+    sparse matrix ``start``: a breadth-first search for all rows at once,
+    one sparse matrix product per step."""
+    numpy, sparse = _numpy_and_sparse()
+    reached = numpy.zeros(start.shape, dtype=bool)
+    frontier = start
+    while frontier.nnz:
+        rows, cols = frontier.nonzero()
+        fresh = ~reached[rows, cols]
+        rows, cols = rows[fresh], cols[fresh]
+        reached[rows, cols] = True
+        frontier = sparse.csr_matrix((numpy.ones(len(rows), dtype=bool), (rows, cols)),
+                                     shape=start.shape) @ adjacency
+    return reached
+
+
+def _chunks(size: int, total: int) -> Iterator[Tuple[int, int]]:
+    """Yield (start, end) bounds splitting ``total`` rows into chunks, each
+    one of at most ``_DENSE_CHUNK_CELLS`` cells of ``size`` columns."""
+    step = max(1, _DENSE_CHUNK_CELLS // max(size, 1))
+    for start in range(0, total, step):
+        yield start, min(start + step, total)
+
+
+def _lines(fileobj: IO) -> Iterator[str]:
+    """Yield the lines of a text or binary (UTF-8) file, read lazily."""
+    for line in fileobj:
+        yield line.decode() if isinstance(line, bytes) else line
+
+
+def _read_edgelist(fileobj: IO) -> Iterator[tuple]:
+    """Yield ``(dependant, supporter)`` edges, or ``(name,)`` for vertices
+    with no edges, from lines of one or two whitespace separated names;
+    blank lines and ``#`` comments are skipped."""
+    for number, line in enumerate(_lines(fileobj), 1):
+        names = tuple(line.split('#', 1)[0].split())
+        if len(names) > 2:
+            raise ValueError(f"line {number}: expected one or two names, got {len(names)}")
+        if names:
+            yield names
+
+
+def _read_jsonl(fileobj: IO) -> Iterator[tuple]:
+    """Yield edges, or names of vertices with no edges, from lines of JSON
+    arrays of two (or one) names; blank lines are skipped."""
+    for number, line in enumerate(_lines(fileobj), 1):
+        if not line.strip():
+            continue
+        names = json.loads(line)
+        if not isinstance(names, list) or len(names) not in (1, 2):
+            raise ValueError(f"line {number}: expected an array of one or two names")
+        yield tuple(tuple(name) if isinstance(name, list) else name for name in names)
+
+
+_DOT_TOKEN = re.compile(
+    r"""\s*(?: "(?P<quoted>(?:[^"\\]|\\.)*)" | (?P<arrow>->) | (?P<attributes>\[[^\]]*\])
+    | (?P<separator>[;{}]) | (?P<comment>(?://|\#).*) | (?P<plain>[\w.]+) | (?P<other>\S))""",
+    re.VERBOSE)
+_DOT_KEYWORDS = ('strict', 'digraph', 'graph', 'subgraph', 'node', 'edge')
+
+
+def _dot_statements(line: str) -> Iterator[list]:
+    """Yield the statements of a DOT line as lists of IDs and ``'->'``
+    operators, skipping keyword statements (e.g. ``digraph x {``), graph
+    attributes, attribute lists and comments; ``None`` stands for an
+    unsupported token."""
+    statement, skipped = [], False
+    for match in _DOT_TOKEN.finditer(line):
+        kind, value = match.lastgroup, match.group(match.lastgroup)
+        if kind == 'quoted':
+            statement.append(re.sub(r'\\(.)', r'\1', value))
+        elif kind in ('arrow', 'plain'):
+            skipped = skipped or not statement and value in _DOT_KEYWORDS
+            statement.append(value)
+        elif kind == 'other':
+            skipped = skipped or value == '='
+            statement.append(None)
+        if kind in ('separator', 'comment'):
+            if not skipped and statement:
+                yield statement
+            statement, skipped = [], False
+        if kind == 'comment':
+            return
+    if not skipped and statement:
+        yield statement
+
+
+def _read_dot(fileobj: IO) -> Iterator[tuple]:
+    """Yield edges, or names of vertices with no edges, from a DOT digraph:
+    ``a -> b -> c`` chains (read as ``a`` depending on ``b``, depending on
+    ``c``) and ``a`` vertices, their attributes ignored. Subgraphs and
+    statements spanning several lines are not supported; keyword
+    statements (e.g. ``node [shape=box]``) and comments are skipped."""
+    for number, line in enumerate(_lines(fileobj), 1):
+        for statement in _dot_statements(line):
+            names = statement[::2]
+            if (None in statement or statement[1::2] != ['->'] * (len(statement) // 2)
+                    or len(statement) % 2 == 0):
+                raise ValueError(f"line {number}: unsupported DOT statement")
+            yield from (zip(names, names[1:]) if len(names) > 1 else [tuple(names)])
+
+
+def _quoted(name: VertexNameT) -> str:
+    return '"' + str(name).replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def _edgelist_line(names: list) -> str:
+    """Return an edgelist line of given names; raise ``ValueError`` on
+    a name which would not be read back as is, see ``_read_edgelist()``."""
+    texts = [str(name) for name in names]
+    for name, text in zip(names, texts):
+        if '#' in text or text.split() != [text]:
+            raise ValueError(f"vertex name {name!r} cannot be written as an edgelist")
+    return ' '.join(texts) + '\n'
+
+
+_READERS = {'edgelist': _read_edgelist, 'jsonl': _read_jsonl, 'dot': _read_dot}
+_WRITERS = {
+    'edgelist': _edgelist_line,
+    'jsonl': lambda names: json.dumps(names) + '\n',
+    'dot': lambda names: '  ' + ' -> '.join(map(_quoted, names)) + ';\n',
+}
+
+
+def _padded(data: bytes) -> bytes:
+    """Return ``data`` padded with zero bytes to a multiple of 8 in size."""
+    return data + bytes(-len(data) % 8)
+
+
+def _split(view: memoryview, start: int, sizes: List[int]) -> List[memoryview]:
+    """Return consecutive slices of ``view`` with given sizes, each one
+    starting at a multiple of 8, beginning from ``start``."""
+    result = []
+    for size in sizes:
+        result.append(view[start:start + size])
+        start += size + (-size % 8)
+    return result
+
+
+VERTEX_CREATED = 'vertex_created'
+EDGE_ADDED = 'edge_added'
+PAYLOAD_SET = 'payload_set'
+PAYLOAD_CLEARED = 'payload_cleared'
+EDGE_REMOVED = 'edge_removed'
+VERTEX_REMOVED = 'vertex_removed'
+
+
+class Change(NamedTuple):
+    """A change of a ``DepDag``, as passed to its subscribers and kept in its
+    change journal. ``kind`` is one of ``VERTEX_CREATED``, ``EDGE_ADDED``,
+    ``PAYLOAD_SET``, ``PAYLOAD_CLEARED``, ``EDGE_REMOVED`` and
+    ``VERTEX_REMOVED``; ``supporter`` is only set for edge changes, ``name``
+    being the dependant then."""
+    version: int
+    kind: str
+    name: VertexNameT
+    supporter: VertexNameT = None
+
+
+class CriticalPath(NamedTuple):
+    """The critical (longest weighted) path of a ``DepDag``, see
+    ``DepDag.critical_path()``. ``earliest_start`` and ``slack`` map vertex
+    names to the earliest time the vertex can start at and to how much it can
+    be delayed without delaying the whole dag, respectively."""
+    length: float
+    path: List['Vertex']
+    earliest_start: Dict[VertexNameT, float]
+    slack: Dict[VertexNameT, float]
+
+
+def _unit_weight(vertex: 'Vertex') -> float:
+    return 1
+
+
+def _order_of(vertex: 'Vertex') -> int:
+    return vertex._order
+
+
+class Stats:
+    """Counters and timings collected by a ``DepDag`` while instrumented,
+    see ``DepDag.instrument()``: the numbers of vertices visited and edges
+    traversed by traversals, of cycle checks run and of probes (callable
+    payloads) called, and the number of calls and total time, in seconds,
+    per operation (e.g. ``'depends_on'`` or ``'probes'``, the evaluation of
+    probes by ``is_resolved()``). Nested operations are timed separately,
+    each one including the time of those it runs.
+
+    If given, ``hook(operation, seconds)`` is called after each timed
+    operation. Not thread safe: counts may be off if several threads use
+    the dag at a time.
+    """
+
+    __slots__ = ('vertices_visited', 'edges_traversed', 'cycle_checks', 'probes_called',
+                 'probe_batches', 'calls', 'timings', '_hook')
+
+    def __init__(self, hook: Callable[[str, float], None] = None):
+        self._hook = hook
+        self.reset()
+
+    def reset(self) -> None:
+        """Set all counters and timings to zero."""
+        self.vertices_visited = self.edges_traversed = self.cycle_checks = 0
+        self.probes_called = self.probe_batches = 0
+        self.calls: Dict[str, int] = {}
+        self.timings: Dict[str, float] = {}
+
+    def record(self, operation: str, seconds: float) -> None:
+        """Add a call of ``operation`` which took ``seconds``."""
+        self.calls[operation] = self.calls.get(operation, 0) + 1
+        self.timings[operation] = self.timings.get(operation, 0.0) + seconds
+        if self._hook is not None:
+            self._hook(operation, seconds)
+
+    def as_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__ if name != '_hook'}
+
+    def __repr__(self) -> str:
+        counts = ', '.join(f'{name}={value}' for name, value in self.as_dict().items()
+                           if not isinstance(value, dict))
+        return f"Stats({counts}, timings={self.timings!r})"
+
+
+def _instrumented(operation: str) -> Callable:
+    """Decorate a ``DepDag`` method to be timed as ``operation`` while the
+    dag is instrumented; otherwise the cost is an extra call and an
+    attribute check per call, so the methods called in bulk while building
+    a dag (``depends_on()`` and ``add_edges()``) time themselves inline."""
+    def decorate(method: Callable) -> Callable:
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            stats = self._stats
+            if stats is None:
+                return method(self, *args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                stats.record(operation, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+_RESOLVED, _UNRESOLVED, _VOLATILE = 'resolved', 'unresolved', 'volatile'
+
+
 class CycleDetected(Exception):
     """Raise when a ``DepDag`` has ``fail_on_cycle = True`` at creation
-    time and an actual cycle is detected during new vertex addition."""
+    time and an actual cycle is detected during new vertex addition.
+
+    The offending vertices, if known, are available as the ``cycle`` list
+    and are also listed in the message.
+    """
+
+    def __init__(self, message: str, cycle: List[Vertex] = None):
+        self.cycle: List[Vertex] = list(cycle or ())
+        if self.cycle:
+            loop = names_list(self.cycle + self.cycle[:1])
+            message = f"{message}: {' -> '.join(map(repr, loop))}"
+        super().__init__(message)
+
+
+class NotRun(Exception):
+    """Reported by ``DepDag.execute()`` and ``DepDag.arun()``, in place of an
+    error, for each vertex not run because some of its direct supporters
+    failed, got no payload or were not run either.
+
+    The names of these supporters are available as the ``supporters`` list
+    and are also listed in the message.
+    """
+
+    def __init__(self, supporters: List[VertexNameT]):
+        self.supporters: List[VertexNameT] = supporters
+        super().__init__(f"supporters not done: {', '.join(map(repr, supporters))}")
 
 
 class Vertex:
     """A named vertex in the DAG which knows its supporters (these are
-    the vertices it depends on directly), the name-to-vertices mapping object
-    and its associated payload state.
+    the vertices it depends on directly), its dependants (the vertices
+    depending on it directly), the name-to-vertices mapping object and its
+    associated payload state.
+
+    The resolution state is kept up to date incrementally: assigning the
+    payload or adding supporters pushes state changes to the affected
+    dependants only. A callable payload is *volatile*: it is a *probe*,
+    called on each ``has_payload()`` check, so vertices depending on it,
+    directly or not, re-evaluate it on each ``is_resolved()`` call (once
+    per call, see the ``probe_ttl`` and ``probe_batch`` options of
+    ``DepDag``).
     """
 
+    __slots__ = ('_name', '_vertices_map', '_supporters', '_dependants',
+                 '_state', '_unresolved', '_volatile', '_payload', '_order')
+
     def __init__(self, name: VertexNameT, vertices_map: DepDag, payload: PayloadT = None):
         self._name: VertexNameT = name
         self._vertices_map: DepDag = vertices_map
-        self._supporters: OrderedDict = OrderedDict()
-        self.payload: PayloadT = payload
+        self._supporters: Dict[VertexNameT, Vertex] = {}  # insertion ordered
+        self._dependants: Dict[VertexNameT, Vertex] = {}
+        self._state: str = _UNRESOLVED
+        self._unresolved: int = 0  # direct supporters in _UNRESOLVED state
+        self._volatile: int = 0  # direct supporters in _VOLATILE state
+        self._payload: PayloadT = payload
+        self._order: int = 0  # topological index, see DepDag._insert_order()
+        self._refresh_state()
 
     def __call__(self, *args, **kwargs):
         """Provide proper error in case a misspelled ``DepDag`` method is called.
@@ -66,44 +550,337 @@ class Vertex:
     def name(self) -> VertexNameT:
         return self._name
 
+    @property
+    def payload(self) -> PayloadT:
+        return self._payload
+
+    @payload.setter
+    def payload(self, payload: PayloadT) -> None:
+        with self._vertices_map._lock:
+            self._payload = payload
+            self._vertices_map._forget_probe(self)
+            self._refresh_state()
+            self._vertices_map._notify(PAYLOAD_CLEARED if payload is None else PAYLOAD_SET,
+                                       self._name)
+
     def has_payload(self) -> bool:
-        if self.payload is None:
+        if self._payload is None:
             return False
-        if callable(self.payload):
-            return self.payload()
+        if callable(self._payload):
+            memo = {}
+            self._vertices_map._probe([self], memo)
+            return memo[self]
+        return True
+
+    def _call_probe(self):
+        """Call the (callable) payload of this vertex and return the result."""
+        result = self._payload()
+        if inspect.iscoroutine(result):
+            result.close()
+            raise TypeError(f"payload of vertex {self._name!r} is a coroutine "
+                            f"function, use ahas_payload() instead")
+        return result
+
+    async def ahas_payload(self) -> bool:
+        """Awaitable counterpart of ``has_payload()``: a callable payload may
+        also return an awaitable."""
+        if self._payload is None:
+            return False
+        if callable(self._payload):
+            memo = {}
+            await self._vertices_map._aprobe([self], memo)
+            return memo[self]
         return True
 
     def depends_on(self, *vertices: VertexNameT) -> None:
         """Define a dependency relationship within the DAG. If any of the vertices
-        does not exist, it is created first.
+        does not exist, it is created, once the cycle check (if any) passed.
         """
-        self._supporters.update(OrderedDict(
-            (vert, self._vertices_map[vert]) for vert in vertices
-        ))
+        dag = self._vertices_map
+        stats = dag._stats  # timed inline, see _instrumented()
+        start = None if stats is None else time.perf_counter()
+        try:
+            with dag._lock:
+                names = [vert for vert in OrderedDict.fromkeys(vertices)
+                         if vert not in self._supporters]
 
-        if self._vertices_map.fail_on_cycle:
-            self._vertices_map.ensure_not_cyclic(
-                f"on adding vertices {vertices}")
+                if dag.fail_on_cycle:
+                    for name in names:
+                        supporter = dag._vertices.get(name)
+                        cycle = [] if supporter is None else dag._insert_order(self, supporter)
+                        if cycle:
+                            raise CycleDetected(f"on adding vertices {vertices}", cycle)
 
-    def all_supporters(self) -> Iterable[Vertex]:
-        """Return a generator iterating over all supporters of this vertex,
-        retrieved recursively, debt-first, left-to-right.
+                if names:
+                    # new supporters have no edges, so they go first in the order
+                    supporters = [dag._vertices.get(name) or dag._add_vertex(name, first=True)
+                                  for name in names]
+                    self._link(supporters)
+                    dag._graph_changed([self])
+                    dag._notify_edges(EDGE_ADDED, self, supporters)
+        finally:
+            if stats is not None:
+                stats.record('depends_on', time.perf_counter() - start)
+
+    def _link(self, supporters: Collection[Vertex]) -> None:
+        """Add given vertices as direct supporters, with no checks, and update
+        the resolution state accordingly; the change is notified by the caller,
+        once done."""
+        for supporter in supporters:
+            self._supporters[supporter.name] = supporter
+            supporter._dependants[self._name] = self
+            self._count(supporter._state, 1)
+        self._refresh_state()
+
+    def remove_dependency(self, *vertices: VertexNameT) -> None:
+        """Remove the dependency relationships with given vertices; names of
+        vertices which are not direct supporters of this one are ignored.
+        The vertices themselves are not removed from the DAG.
         """
-        for supporter in self._supporters.values():
-            yield supporter
+        with self._vertices_map._lock:
+            supporters = [self._supporters[vert] for vert in OrderedDict.fromkeys(vertices)
+                          if vert in self._supporters]
+            if supporters:
+                self._vertices_map._graph_changed([self])
+                self._unlink(supporters)
+                self._vertices_map._notify_edges(EDGE_REMOVED, self, supporters)
 
-        for vert in self._supporters.values():
-            for supporter in vert.all_supporters():
-                yield supporter
+    def _unlink(self, supporters: Collection[Vertex]) -> None:
+        """Remove given vertices from the direct supporters and update the
+        resolution state accordingly; the change is notified by the caller,
+        once done."""
+        for supporter in supporters:
+            del self._supporters[supporter.name]
+            del supporter._dependants[self._name]
+            self._count(supporter._state, -1)
+        self._refresh_state()
+
+    def _count(self, supporter_state: str, delta: int) -> None:
+        if supporter_state == _UNRESOLVED:
+            self._unresolved += delta
+        elif supporter_state == _VOLATILE:
+            self._volatile += delta
+
+    def _evaluate_state(self) -> str:
+        if self._payload is None or self._unresolved:
+            return _UNRESOLVED
+        if self._volatile or callable(self._payload):
+            return _VOLATILE
+        return _RESOLVED
+
+    def _refresh_state(self) -> None:
+        """Re-evaluate the resolution state of this vertex and push any change
+        to its dependants, recursively."""
+        queue = [self]
+        while queue:
+            vertex = queue.pop()
+            old_state, new_state = vertex._state, vertex._evaluate_state()
+            if old_state == new_state:
+                continue
+            vertex._state = new_state
+            for dependant in vertex._dependants.values():
+                dependant._count(old_state, -1)
+                dependant._count(new_state, 1)
+                queue.append(dependant)
+
+    def all_supporters(self, unique: bool = False) -> Iterable[Vertex]:
+        """Return an iterable over all supporters of this vertex, retrieved
+        recursively, depth-first, left-to-right.
+
+        With ``unique=True`` each supporter is listed only once; the result
+        is then also cached if the dag has been created with
+        ``cache_closures=True``.
+        """
+        if not unique:
+            return _walk(self, self._vertices_map._counted(Vertex.direct_supporters))
+        return self._vertices_map.closure(self)
 
     def direct_supporters(self) -> Iterable[Vertex]:
         """Return an iterable of supporters directly related to this vertex."""
+        if self._vertices_map._thread_safe:
+            return tuple(self._supporters.values())
         return self._supporters.values()
 
-    def is_resolved(self):
-        return self.has_payload() and all(
-            vertex.is_resolved() for vertex in self.direct_supporters()
-        )
+    def direct_dependants(self) -> Iterable[Vertex]:
+        """Return an iterable of dependants directly related to this vertex."""
+        if self._vertices_map._thread_safe:
+            return tuple(self._dependants.values())
+        return self._dependants.values()
+
+    def all_dependants(self) -> Iterable[Vertex]:
+        """Return a generator iterating over all dependants of this vertex,
+        retrieved recursively, each one listed once, in order of first
+        occurrence.
+        """
+        return _walk(self, self._vertices_map._counted(Vertex.direct_dependants), unique=True)
+
+    def is_resolved(self) -> bool:
+        """Return ``True`` if this vertex and all its supporters, recursively,
+        have payload. Takes constant time unless a volatile (callable)
+        payload needs to be checked; each one is called at most once.
+
+        On a cyclic dag (with no ``fail_on_cycle``), the result is undefined
+        for the vertices on or depending on a cycle: it depends on the order
+        of the changes made. It is exact again once the cycle is removed.
+        """
+        return self._is_resolved({})
+
+    def _is_resolved(self, memo: Dict[Vertex, object]) -> bool:
+        """Implement ``is_resolved()``, taking probe results from (and
+        adding them to) ``memo``. A volatile vertex has no unresolved
+        supporters, so only its volatile supporters are visited, iteratively,
+        and the probes among them evaluated."""
+        if self._state != _VOLATILE:
+            return self._state == _RESOLVED
+        return self._vertices_map._probe(self._probed(), memo)
+
+    def _probed(self) -> Iterator[Vertex]:
+        """Yield the vertices having probes among this volatile vertex and
+        its volatile supporters, recursively, each one once."""
+        volatile = chain([self], _walk(
+            self, self._vertices_map._counted(Vertex._volatile_supporters), unique=True))
+        return (vertex for vertex in volatile if callable(vertex._payload))
+
+    def _volatile_supporters(self) -> List[Vertex]:
+        return [vertex for vertex in self.direct_supporters() if vertex._state == _VOLATILE]
+
+    async def ais_resolved(self) -> bool:
+        """Awaitable counterpart of ``is_resolved()``, see ``ahas_payload()``;
+        probes are awaited in turn, each one at most once."""
+        if self._state != _VOLATILE:
+            return self._state == _RESOLVED
+        return await self._vertices_map._aprobe(self._probed(), {})
+
+
+class _Schedule:
+    """Bookkeeping for running given vertices (those having no payload), each
+    one once all its direct supporters have payload. Vertices ready to be run
+    are appended to ``ready``, failures are collected in ``errors``.
+
+    Raise ``CycleDetected`` if there is a cycle among given vertices, as
+    these would never be ready.
+    """
+
+    def __init__(self, vertices: Iterable[Vertex]):
+        self._waiting = OrderedDict((vertex, 0) for vertex in vertices)
+        for vertex in self._waiting:
+            self._waiting[vertex] = sum(
+                1 for supporter in vertex.direct_supporters() if supporter in self._waiting)
+        cycle = _find_cycle(self._waiting, self._supporters_waiting)
+        if cycle:
+            raise CycleDetected("on executing vertices", cycle)
+        self.ready = deque(vertex for vertex, count in self._waiting.items() if not count)
+        self.errors: Dict[VertexNameT, BaseException] = OrderedDict()
+        self._run: set = set()  # vertices run
+        self._done: set = set()  # vertices run, having got payload
+
+    def _supporters_waiting(self, vertex: Vertex) -> List[Vertex]:
+        return [supporter for supporter in vertex.direct_supporters()
+                if supporter in self._waiting]
+
+    @staticmethod
+    def arguments(vertex: Vertex) -> tuple:
+        """Return the run method arguments for ``vertex``."""
+        return vertex.name, OrderedDict(
+            (supporter.name, supporter.payload) for supporter in vertex.direct_supporters())
+
+    def finish(self, vertex: Vertex, future: Future, fail_fast: bool) -> None:
+        """Store the outcome of running ``vertex``; re-raise the error, if any
+        and ``fail_fast`` is set."""
+        self._run.add(vertex)
+        error = future.exception()
+        if error is not None:
+            self.errors[vertex.name] = error
+            if fail_fast:
+                raise error
+            return
+        vertex.payload = future.result()
+        if vertex.payload is None:
+            return
+        self._done.add(vertex)
+        for dependant in vertex.direct_dependants():
+            if dependant in self._waiting:
+                self._waiting[dependant] -= 1
+                if not self._waiting[dependant]:
+                    self.ready.append(dependant)
+
+    def outcome(self) -> Dict[VertexNameT, BaseException]:
+        """Return the ``errors``, followed by a ``NotRun`` error for each
+        vertex never run, once there is nothing left to run."""
+        for vertex in self._waiting:
+            if vertex not in self._run:
+                self.errors[vertex.name] = NotRun(names_list(
+                    supporter for supporter in self._supporters_waiting(vertex)
+                    if supporter not in self._done))
+        return self.errors
+
+
+class Rebuild:
+    """Incremental rebuild of the dependants of some changed vertices, with
+    *early cutoff*: a dirty vertex is run only if at least one of its dirty
+    supporters has changed when run, and is skipped otherwise.
+
+    Vertices become ready once all their dirty supporters are done, see
+    ``ready()``; report each one run via ``done()``. Iterating a ``Rebuild``
+    yields the ready vertices lazily, as those yielded before are reported
+    done. Create via ``DepDag.rebuild()``.
+    """
+
+    def __init__(self, dirty: List[Vertex], changed: Iterable[Vertex]):
+        self._waiting = OrderedDict((vertex, 0) for vertex in dirty)
+        for vertex in dirty:
+            for dependant in vertex.direct_dependants():
+                if dependant in self._waiting:
+                    self._waiting[dependant] += 1
+        self._needed = set(changed)
+        self._ready = deque(vertex for vertex in dirty if not self._waiting[vertex])
+        self.skipped: List[Vertex] = []
+
+    def __iter__(self) -> Iterator[Vertex]:
+        while self._ready:
+            yield self._ready.popleft()
+
+    def ready(self) -> List[Vertex]:
+        """Return the vertices to be run next and are not returned yet."""
+        result = list(self._ready)
+        self._ready.clear()
+        return result
+
+    def is_finished(self) -> bool:
+        """Return ``True`` if all dirty vertices have been run or skipped."""
+        return not self._waiting
+
+    def done(self, vertex: Vertex, changed: bool = True) -> None:
+        """Report that ``vertex`` has been run and whether this has
+        ``changed`` its payload; dependants of ``vertex`` for which no dirty
+        supporters changed are skipped, listed in ``skipped``."""
+        finished = [(vertex, changed)]
+        while finished:
+            vertex, changed = finished.pop()
+            del self._waiting[vertex]
+            for dependant in vertex.direct_dependants():
+                if dependant not in self._waiting:
+                    continue
+                if changed:
+                    self._needed.add(dependant)
+                self._waiting[dependant] -= 1
+                if self._waiting[dependant]:
+                    continue
+                if dependant in self._needed:
+                    self._ready.append(dependant)
+                else:
+                    self.skipped.append(dependant)
+                    finished.append((dependant, False))
+
+    def run(self, fn: RunMethodT) -> None:
+        """Run all dirty vertices not skipped, in turn, setting the payload of
+        each one to ``fn(name, supporters_payloads)``; the vertex has changed
+        if the new payload is not equal to the old one."""
+        for vertex in self:
+            payload = fn(*_Schedule.arguments(vertex))
+            changed = payload != vertex.payload
+            vertex.payload = payload
+            self.done(vertex, changed)
 
 
 class DepDag:
@@ -118,75 +895,847 @@ class DepDag:
     use the ``create()`` method.
     """
 
-    __slots__ = ('_vertices', '_fail_on_cycle')
+    __slots__ = ('_vertices', '_fail_on_cycle', '_closures', '_levels',
+                 '_version', '_subscribers', '_journal', '_thread_safe', '_lock',
+                 '_probe_ttl', '_probe_cache', '_probe_batch', '_stats',
+                 '_min_order', '_max_order')
 
-    def __init__(self, fail_on_cycle: bool = False):
+    def __init__(self, fail_on_cycle: bool = False, cache_closures: bool = False,
+                 journal_size: int = None, thread_safe: bool = False,
+                 probe_ttl: float = None, probe_batch: ProbeBatchMethodT = None):
         """Initialize the DepDag.
 
         @param bool fail_on_cycle: when ``True``, inspect the dag for new
            cycles at each vertex addition and if the check is positive --
-           raise ``CycleDetected`` exception.
+           raise ``CycleDetected`` exception. Only the newly added edges are
+           checked, against a topological order of the vertices kept up to
+           date, so that only the vertices ordered between the two ends of
+           an edge are visited, if any. A rejected ``depends_on()`` call
+           leaves the dag unchanged; see ``add_edges()`` for bulk loading.
+        @param bool cache_closures: when ``True``, cache the unique transitive
+           supporters of each vertex queried via ``closure()`` (or
+           ``all_supporters(unique=True)``) until new edges are added to it
+           or to any of its supporters.
+        @param int journal_size: when given, keep a journal of the last
+           ``journal_size`` changes, see ``changes_since()``.
+        @param bool thread_safe: when ``True``, changes are serialized with
+           a lock, while vertex queries (e.g. ``is_resolved()`` or
+           ``all_supporters()``) run with no locking, on snapshots of the
+           edges of each vertex visited; whole-dag queries (e.g.
+           ``levels()`` or ``find_cycle()``) hold the lock for consistency.
+        @param float probe_ttl: when given, cache the results of volatile
+           (callable) payloads, *probes*, for ``probe_ttl`` seconds, across
+           queries; see ``clear_probe_cache()``. Otherwise each probe is
+           called at most once per query, e.g. per ``is_resolved()`` call.
+        @param probe_batch: when given, called with a list of the vertices
+           whose probes need to be evaluated by a query, all at once,
+           instead of calling the probes; it returns their results, in the
+           same order (e.g. checking many files with a single sweep); with
+           ``ais_resolved()``, the results may also be returned awaitable.
         """
         self._vertices: Dict[VertexNameT, Vertex] = OrderedDict()
         self._fail_on_cycle = fail_on_cycle
+        self._closures: Optional[Dict[Vertex, tuple]] = {} if cache_closures else None
+        self._levels: Optional[List[List[Vertex]]] = None
+        self._version: int = 0
+        self._subscribers: List[Callable[[Change], None]] = []
+        self._journal: Optional[deque] = (
+            None if journal_size is None else deque(maxlen=journal_size))
+        self._thread_safe: bool = thread_safe
+        self._lock = RLock() if thread_safe else nullcontext()
+        self._probe_ttl: Optional[float] = probe_ttl
+        self._probe_cache: Optional[Dict[Vertex, tuple]] = None if probe_ttl is None else {}
+        self._probe_batch: Optional[ProbeBatchMethodT] = probe_batch
+        self._stats: Optional[Stats] = None
+        self._min_order: int = 0
+        self._max_order: int = -1
 
     @property
     def fail_on_cycle(self) -> bool:
         return self._fail_on_cycle
 
+    @property
+    def version(self) -> int:
+        """The number of changes made to this dag so far: vertices and edges
+        added or removed and payloads assigned."""
+        return self._version
+
+    def subscribe(self, callback: Callable[[Change], None]) -> None:
+        """Have ``callback`` called with a ``Change`` after each change of
+        this dag."""
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[Change], None]) -> None:
+        self._subscribers.remove(callback)
+
+    def changes_since(self, version: int) -> List[Change]:
+        """Return the journaled changes made after given ``version``, oldest
+        first.
+
+        Raise ``ValueError`` if the dag has been created without a journal
+        or some of these changes are no longer in it.
+        """
+        if self._journal is None:
+            raise ValueError("dag has no change journal")
+        with self._lock:
+            journal, latest = tuple(self._journal), self._version
+        oldest = journal[0].version if journal else latest + 1
+        if version + 1 < oldest:
+            raise ValueError(f"changes since version {version} are no longer journaled")
+        return [change for change in journal if change.version > version]
+
+    def _notify(self, kind: str, name: VertexNameT, supporter: VertexNameT = None) -> None:
+        self._version += 1
+        if not self._subscribers and self._journal is None:
+            return
+        change = Change(self._version, kind, name, supporter)
+        if self._journal is not None:
+            self._journal.append(change)
+        for callback in self._subscribers:
+            callback(change)
+
+    def _notify_edges(self, kind: str, dependant: Vertex, supporters: Iterable[Vertex]) -> None:
+        """Notify the addition or removal (``kind``) of the edges from
+        ``dependant`` to ``supporters``, see ``_notify()``; called once the
+        dag, its caches and topological order included, is up to date."""
+        for supporter in supporters:
+            self._notify(kind, dependant.name, supporter.name)
+
+    @contextmanager
+    def instrument(self, stats: Stats = None) -> Iterator[Stats]:
+        """Return a context manager collecting ``Stats`` (the given ones,
+        or new ones) on the use of this dag, while in the ``with`` block::
+
+            with dag.instrument() as stats:
+                dag.a.is_resolved()
+            print(stats.vertices_visited, stats.timings)
+        """
+        stats = Stats() if stats is None else stats
+        previous, self._stats = self._stats, stats
+        try:
+            yield stats
+        finally:
+            self._stats = previous
+
+    @property
+    def stats(self) -> Optional[Stats]:
+        """The ``Stats`` being collected, if instrumented, else ``None``."""
+        return self._stats
+
+    def _counted(self, neighbours_of: Callable) -> Callable:
+        """Return ``neighbours_of`` as is or, while instrumented, wrapped to
+        count the vertices it is called for and the edges it returns."""
+        stats = self._stats
+        if stats is None:
+            return neighbours_of
+
+        def counted(node):
+            neighbours = tuple(neighbours_of(node))
+            stats.vertices_visited += 1
+            stats.edges_traversed += len(neighbours)
+            return neighbours
+        return counted
+
+    def _count_cycle_check(self) -> None:
+        if self._stats is not None:
+            self._stats.cycle_checks += 1
+
+    @_instrumented('probes')
+    def _probe(self, vertices: Iterable[Vertex], memo: Dict[Vertex, object]) -> bool:
+        """Return ``True`` if the probes (callable payloads) of all given
+        vertices return true. Results are taken from (and added to) ``memo``
+        and the probe cache, if any; with no ``probe_batch`` method, probes
+        are called in turn, until one returns false."""
+        if self._probe_batch is None:
+            return all(self._probe_one(vertex, memo) for vertex in vertices)
+        vertices = list(vertices)
+        missing = self._missing_probes(vertices, memo)
+        if missing:
+            self._store_batch(missing, self._probe_batch(missing), memo)
+        return all(memo[vertex] for vertex in vertices)
+
+    async def _aprobe(self, vertices: Iterable[Vertex], memo: Dict[Vertex, object]) -> bool:
+        """Awaitable counterpart of ``_probe()``: probes, and the
+        ``probe_batch`` method, may also return awaitables."""
+        if self._probe_batch is None:
+            for vertex in vertices:
+                if vertex not in memo and not self._cached_probe(vertex, memo):
+                    self._count_probes(1)
+                    result = vertex._payload()
+                    if inspect.isawaitable(result):
+                        result = await result
+                    self._store_probe(vertex, result, memo)
+                if not memo[vertex]:
+                    return False
+            return True
+        vertices = list(vertices)
+        missing = self._missing_probes(vertices, memo)
+        if missing:
+            results = self._probe_batch(missing)
+            if inspect.isawaitable(results):
+                results = await results
+            self._store_batch(missing, results, memo)
+        return all(memo[vertex] for vertex in vertices)
+
+    def _probe_one(self, vertex: Vertex, memo: Dict[Vertex, object]):
+        if vertex not in memo and not self._cached_probe(vertex, memo):
+            self._count_probes(1)
+            self._store_probe(vertex, vertex._call_probe(), memo)
+        return memo[vertex]
+
+    def _missing_probes(self, vertices: List[Vertex], memo: Dict[Vertex, object]) -> list:
+        """Return the given vertices whose probe results are neither in
+        ``memo`` nor in the probe cache, each one once."""
+        return [vertex for vertex in OrderedDict.fromkeys(vertices)
+                if vertex not in memo and not self._cached_probe(vertex, memo)]
+
+    def _store_batch(self, vertices: List[Vertex], results: Iterable,
+                     memo: Dict[Vertex, object]) -> None:
+        self._count_probes(len(vertices), batches=1)
+        for vertex, result in zip(vertices, results):
+            self._store_probe(vertex, result, memo)
+
+    def _count_probes(self, probes: int, batches: int = 0) -> None:
+        if self._stats is not None:
+            self._stats.probes_called += probes
+            self._stats.probe_batches += batches
+
+    def _cached_probe(self, vertex: Vertex, memo: Dict[Vertex, object]) -> bool:
+        """Copy the cached probe result of ``vertex``, if any and not
+        expired, to ``memo``; return ``True`` if there was one."""
+        if self._probe_cache is None:
+            return False
+        entry = self._probe_cache.get(vertex)
+        if entry is None or entry[1] < time.monotonic():
+            return False
+        memo[vertex] = entry[0]
+        return True
+
+    def _store_probe(self, vertex: Vertex, result, memo: Dict[Vertex, object]) -> None:
+        memo[vertex] = result
+        if self._probe_cache is not None:
+            self._probe_cache[vertex] = (result, time.monotonic() + self._probe_ttl)
+
+    def _forget_probe(self, vertex: Vertex) -> None:
+        if self._probe_cache is not None:
+            self._probe_cache.pop(vertex, None)
+
+    def clear_probe_cache(self) -> None:
+        """Drop all cached probe results, see the ``probe_ttl`` option."""
+        if self._probe_cache is not None:
+            self._probe_cache.clear()
+
     def __contains__(self, item):
         return item in self._vertices
 
     def __len__(self):
         return len(self._vertices)
 
+    @property
+    def thread_safe(self) -> bool:
+        return self._thread_safe
+
     def __iter__(self):
+        if self._thread_safe:
+            return iter(tuple(self._vertices.items()))
         return ((k, v) for k, v in self._vertices.items())
 
     def __getattr__(self, name: VertexNameT) -> Vertex:
-        if name not in self._vertices:
-            self._vertices[name] = Vertex(name, self)
-        return self._vertices[name]
+        return self[name]
 
     def __getitem__(self, name: VertexNameT) -> Vertex:
-        if name not in self._vertices:
-            self._vertices[name] = Vertex(name, self)
-        return self._vertices[name]
+        vertex = self._vertices.get(name)
+        if vertex is None:
+            with self._lock:
+                vertex = self._vertices.get(name) or self._add_vertex(name)
+        return vertex
 
     def __setitem__(self, name: VertexNameT, value: Vertex) -> None:
         raise NotImplementedError("cannot set/assign vertex")
 
     def new_vertex(self, name: VertexNameT, payload: PayloadT = None) -> Vertex:
-        assert name not in self._vertices
+        with self._lock:
+            assert name not in self._vertices
+            return self._add_vertex(name, payload)
+
+    def _add_vertex(self, name: VertexNameT, payload: PayloadT = None,
+                    first: bool = False) -> Vertex:
+        """Create a vertex, last (or ``first``) in the topological order."""
         self._vertices[name] = result = Vertex(name, self, payload)
+        if first:
+            self._min_order -= 1
+            result._order = self._min_order
+        else:
+            self._max_order += 1
+            result._order = self._max_order
+        self._levels = None
+        self._notify(VERTEX_CREATED, name)
         return result
 
+    @classmethod
+    def from_edges(cls, edges: Iterable[EdgeT], **kwargs) -> DepDag:
+        """Create a new dag, passing ``kwargs`` to the constructor, and
+        populate it via ``add_edges(edges)``."""
+        dag = cls(**kwargs)
+        dag.add_edges(edges)
+        return dag
+
+    @classmethod
+    def from_stream(cls, fileobj: IO, format: str = 'edgelist', **kwargs) -> DepDag:
+        """Create a new dag, passing ``kwargs`` to the constructor, and
+        populate it with the edges read from ``fileobj`` (a text or binary
+        file object), lazily, line by line, via a single ``add_edges()``
+        call; so memory use depends on the size of the dag, not that of the
+        file, and cycles are checked once, at the end (if
+        ``fail_on_cycle``). Names are read as strings (and JSON values).
+
+        Formats, as written by ``to_stream()``:
+
+        - ``'edgelist'``: a ``dependant supporter`` pair of names, or a
+          single name of a vertex with no edges, per line.
+        - ``'jsonl'``: a JSON array of such names per line.
+        - ``'dot'``: a Graphviz ``digraph`` of ``dependant -> supporter``
+          edges, see ``_read_dot()`` for the supported subset.
+
+        Raise ``ValueError`` on an unknown format or a malformed line.
+        """
+        if format not in _READERS:
+            raise ValueError(f"unknown format {format!r}")
+        dag = cls(**kwargs)
+
+        def edges():
+            for names in _READERS[format](fileobj):
+                if len(names) == 2:
+                    yield names
+                else:
+                    dag[names[0]]
+
+        dag.add_edges(edges())
+        return dag
+
+    def to_stream(self, fileobj: IO, format: str = 'edgelist') -> None:
+        """Write the edges of this dag, along with the vertices having no
+        edges, to the text file object ``fileobj``, one line at a time, in
+        one of the formats read by ``from_stream()``. Names are written as
+        strings; payloads are not written.
+
+        Raise ``ValueError`` on an unknown format or, with the ``'edgelist'``
+        format, on a name which is empty or contains whitespace or ``#``
+        (the lines before are written).
+        """
+        if format not in _WRITERS:
+            raise ValueError(f"unknown format {format!r}")
+        write = _WRITERS[format]
+        if format == 'dot':
+            fileobj.write('digraph depdag {\n')
+        for vertex in self.all_vertices():
+            supporters = vertex.direct_supporters()
+            for supporter in supporters:
+                fileobj.write(write([vertex.name, supporter.name]))
+            if not supporters and not vertex._dependants:
+                fileobj.write(write([vertex.name]))
+        if format == 'dot':
+            fileobj.write('}\n')
+
+    def add_edges(self, edges: Iterable[EdgeT]) -> None:
+        """Add ``(dependant, supporter)`` name pairs as edges, creating the
+        vertices as needed, in a single pass over ``edges`` (which may be
+        a generator). If ``fail_on_cycle`` is set, the new edges are checked
+        for cycles before any of them is added, and on failure
+        ``CycleDetected`` is raised with none of them added (new vertices
+        stay, though).
+        """
+        stats = self._stats  # timed inline, see _instrumented()
+        start = None if stats is None else time.perf_counter()
+        try:
+            with self._lock:
+                staged: Dict[Vertex, Dict[VertexNameT, Vertex]] = {}
+                for dependant_name, supporter_name in edges:
+                    dependant = self[dependant_name]
+                    # new supporters have no edges, so they go first in the order
+                    supporter = (self._vertices.get(supporter_name)
+                                 or self._add_vertex(supporter_name, first=True))
+                    if supporter_name not in dependant._supporters:
+                        staged.setdefault(dependant, {})[supporter_name] = supporter
+
+                renumber = self._fail_on_cycle and self._order_edges(staged)
+                for dependant, supporters in staged.items():
+                    dependant._link(supporters.values())
+                self._graph_changed(staged)
+                if renumber:
+                    self._renumber()
+                for dependant, supporters in staged.items():
+                    self._notify_edges(EDGE_ADDED, dependant, supporters.values())
+        finally:
+            if stats is not None:
+                stats.record('add_edges', time.perf_counter() - start)
+
+    @_instrumented('remove_edges')
+    def remove_edges(self, edges: Iterable[EdgeT]) -> None:
+        """Remove ``(dependant, supporter)`` name pairs edges; pairs which
+        are not edges of this dag are ignored. Vertices are not removed.
+        """
+        with self._lock:
+            staged: Dict[Vertex, Dict[VertexNameT, Vertex]] = {}
+            for dependant_name, supporter_name in edges:
+                dependant = self._vertices.get(dependant_name)
+                if dependant is not None and supporter_name in dependant._supporters:
+                    supporter = dependant._supporters[supporter_name]
+                    staged.setdefault(dependant, {})[supporter_name] = supporter
+
+            self._graph_changed(staged)
+            for dependant, supporters in staged.items():
+                dependant._unlink(supporters.values())
+            for dependant, supporters in staged.items():
+                self._notify_edges(EDGE_REMOVED, dependant, supporters.values())
+
+    def remove_vertex(self, name: VertexNameT) -> None:
+        """Remove the vertex with given name, along with all its edges.
+
+        Raise ``KeyError`` if there is no such vertex.
+        """
+        with self._lock:
+            vertex = self._vertices[name]
+            supporters = list(vertex.direct_supporters())
+            dependants = list(vertex.direct_dependants())
+            self._graph_changed([vertex])
+            vertex._unlink(supporters)
+            for dependant in dependants:
+                dependant._unlink([vertex])
+            del self._vertices[name]
+            self._forget_probe(vertex)
+            self._notify_edges(EDGE_REMOVED, vertex, supporters)
+            for dependant in dependants:
+                self._notify_edges(EDGE_REMOVED, dependant, [vertex])
+            self._notify(VERTEX_REMOVED, name)
+
+    def remove_vertices(self, names: Iterable[VertexNameT]) -> None:
+        """Remove the vertices with given names, see ``remove_vertex()``."""
+        for name in names:
+            self.remove_vertex(name)
+
     def all_vertices(self) -> Iterable[Vertex]:
         """Return an iterable of all vertices within this dag, ordered as created."""
+        if self._thread_safe:
+            return tuple(self._vertices.values())
         return self._vertices.values()
 
+    def closure(self, vertex: Vertex) -> Iterable[Vertex]:
+        """Return an iterable over all supporters of ``vertex``, retrieved
+        recursively, each one listed once, in order of first occurrence.
+        """
+        if self._closures is None:
+            return _walk(vertex, self._counted(Vertex.direct_supporters), unique=True)
+        result = self._closures.get(vertex)
+        if result is None:
+            version = self._version
+            result = tuple(_walk(vertex, self._counted(Vertex.direct_supporters), unique=True))
+            with self._lock:
+                if version == self._version:
+                    self._closures[vertex] = result
+        return iter(result)
+
+    def _graph_changed(self, vertices: Iterable[Vertex]) -> None:
+        """Drop any cached data invalidated by a change of the direct
+        supporters of given vertices."""
+        self._levels = None
+        if not self._closures:
+            return
+        stack = list(vertices)
+        seen = set(stack)
+        while stack:
+            vertex = stack.pop()
+            self._closures.pop(vertex, None)
+            for dependant in vertex.direct_dependants():
+                if dependant not in seen:
+                    seen.add(dependant)
+                    stack.append(dependant)
+
+    @_instrumented('levels')
+    def levels(self) -> List[List[Vertex]]:
+        """Return the vertices of this dag grouped into *levels* (or *waves*):
+        the first level holds the vertices with no supporters, each next one
+        the vertices all of whose supporters are in the previous levels. The
+        vertices of a level do not depend on each other and so can be
+        processed concurrently. Within a level, vertices are ordered as
+        created. The result is cached until the dag is changed.
+
+        Raise ``CycleDetected`` if the dag is cyclic.
+        """
+        levels = self._levels
+        if levels is None:
+            with self._lock:
+                levels = _levels(list(self.all_vertices()), Vertex.direct_supporters,
+                                 self._counted(Vertex.direct_dependants))
+                if levels is None:
+                    self.ensure_not_cyclic()
+                self._levels = levels
+        return [list(level) for level in levels]
+
+    def topological_order(self) -> List[Vertex]:
+        """Return a list of all vertices ordered so that each vertex comes
+        after all its supporters; that is, the ``levels()``, concatenated.
+
+        Raise ``CycleDetected`` if the dag is cyclic.
+        """
+        return [vertex for level in self.levels() for vertex in level]
+
+    @_instrumented('invalidate')
+    def invalidate(self, changed: Iterable[VertexNameT]) -> List[Vertex]:
+        """Return the vertices having given names and all their dependants,
+        recursively, in topological order: the vertices to be run again once
+        the ``changed`` ones have changed. Only these vertices are visited.
+
+        Raise ``KeyError`` on a missing vertex name, ``CycleDetected`` if
+        there is a cycle among the returned vertices.
+        """
+        with self._lock:
+            dirty = OrderedDict.fromkeys(self._vertices[name] for name in changed)
+            queue = list(dirty)
+            for vertex in queue:
+                for dependant in vertex.direct_dependants():
+                    if dependant not in dirty:
+                        dirty[dependant] = None
+                        queue.append(dependant)
+            levels = _levels(queue, Vertex.direct_supporters,
+                             self._counted(Vertex.direct_dependants))
+            if levels is None:
+                raise CycleDetected("on invalidating vertices", _find_cycle(
+                    queue, lambda vertex: [s for s in vertex.direct_supporters() if s in dirty]))
+            return [vertex for level in levels for vertex in level]
+
+    def rebuild(self, changed: Iterable[VertexNameT]) -> Rebuild:
+        """Return a ``Rebuild`` running the vertices having given names, then
+        their dependants as needed, with early cutoff; see ``invalidate()``.
+        """
+        changed = list(changed)
+        return Rebuild(self.invalidate(changed), [self._vertices[name] for name in changed])
+
+    def execute(self, fn: RunMethodT, executor: Executor = None,
+                max_concurrency: int = None, fail_fast: bool = True,
+                cancel: Event = None) -> Dict[VertexNameT, BaseException]:
+        """Compute the payload of each vertex having none, as soon as all its
+        direct supporters have payload, via ``fn(name, supporters_payloads)``
+        (the latter being a dict mapping the direct supporters names to their
+        payloads) called in ``executor``. The result is assigned as the
+        vertex payload; if it is ``None``, dependants of the vertex are not
+        run.
+
+        Raise ``CycleDetected`` upfront if there is a cycle among the
+        vertices having no payload.
+
+        @param executor: a ``concurrent.futures`` executor; by default a
+           ``ThreadPoolExecutor`` is created and shut down on return. With a
+           ``ProcessPoolExecutor``, ``fn`` and payloads need to be picklable.
+        @param int max_concurrency: max number of vertices run at a time.
+        @param bool fail_fast: when ``True``, cancel pending work and
+           re-raise on the first error, otherwise keep running the vertices
+           not depending on failed ones.
+        @param Event cancel: when set, cancel pending work and raise
+           ``CancelledError``.
+        @return: a dict mapping names of failed vertices to their errors,
+           followed by the names of the vertices not run, because of failed
+           supporters or supporters with no payload, mapped to ``NotRun``
+           errors.
+        """
+        schedule = _Schedule(
+            vertex for vertex in self.all_vertices() if not vertex.has_payload())
+        own_executor = executor is None
+        if own_executor:
+            executor = ThreadPoolExecutor(max_concurrency)
+        timeout = None if cancel is None else 0.05
+        running: Dict[Future, Vertex] = {}
+        try:
+            while schedule.ready or running:
+                if cancel is not None and cancel.is_set():
+                    raise CancelledError()
+                while schedule.ready and (
+                        max_concurrency is None or len(running) < max_concurrency):
+                    vertex = schedule.ready.popleft()
+                    running[executor.submit(fn, *schedule.arguments(vertex))] = vertex
+                finished, _ = wait(running, timeout, FIRST_COMPLETED)
+                for future in finished:
+                    schedule.finish(running.pop(future), future, fail_fast)
+        finally:
+            for future in running:
+                future.cancel()
+            if own_executor:
+                executor.shutdown()
+        return schedule.outcome()
+
+    async def arun(self, coro_factory: CoroutineFactoryT, max_concurrency: int = None,
+                   fail_fast: bool = True) -> Dict[VertexNameT, BaseException]:
+        """Awaitable counterpart of ``execute()``: compute the payload of each
+        vertex having none, as soon as all its direct supporters have
+        payload, by awaiting ``coro_factory(name, supporters_payloads)``
+        within the running event loop. Cancelling the ``arun()`` task cancels
+        all pending work.
+
+        Raise ``CycleDetected`` upfront if there is a cycle among the
+        vertices having no payload.
+
+        @param int max_concurrency: max number of vertices run at a time.
+        @param bool fail_fast: when ``True``, cancel pending work and
+           re-raise on the first error, otherwise keep running the vertices
+           not depending on failed ones.
+        @return: a dict mapping names of failed vertices to their errors,
+           and of the vertices not run to ``NotRun`` errors, see
+           ``execute()``.
+        """
+        schedule = _Schedule(
+            [vertex for vertex in self.all_vertices() if not await vertex.ahas_payload()])
+        running: Dict[asyncio.Future, Vertex] = {}
+        try:
+            while schedule.ready or running:
+                while schedule.ready and (
+                        max_concurrency is None or len(running) < max_concurrency):
+                    vertex = schedule.ready.popleft()
+                    task = asyncio.ensure_future(coro_factory(*schedule.arguments(vertex)))
+                    running[task] = vertex
+                finished, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in finished:
+                    schedule.finish(running.pop(task), task, fail_fast)
+        finally:
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.wait(running)
+        return schedule.outcome()
+
+    @_instrumented('critical_path')
+    def critical_path(self, weight: WeightMethodT = _unit_weight) -> CriticalPath:
+        """Return the ``CriticalPath`` of this dag: the chain of vertices,
+        supporters first, having the largest total ``weight(vertex)`` (the
+        cost of processing the vertex, 1 by default), along with the
+        earliest start time and the slack of each vertex, when supporters are
+        processed before their dependants and with no limit on concurrency.
+        Runs in linear time.
+
+        Raise ``CycleDetected`` if the dag is cyclic.
+        """
+        with self._lock:
+            order = self.topological_order()
+            cost = {vertex: weight(vertex) for vertex in order}
+            start, critical = {}, {}
+            for vertex in order:
+                start[vertex] = 0
+                for supporter in vertex.direct_supporters():
+                    if start[supporter] + cost[supporter] > start[vertex]:
+                        start[vertex] = start[supporter] + cost[supporter]
+                        critical[vertex] = supporter
+            length = max((start[vertex] + cost[vertex] for vertex in order), default=0)
+            latest = {}
+            for vertex in reversed(order):
+                latest[vertex] = min(
+                    (latest[dependant] for dependant in vertex.direct_dependants()),
+                    default=length) - cost[vertex]
+            path = []
+            vertex = max(order, key=lambda vert: start[vert] + cost[vert], default=None)
+            while vertex is not None:
+                path.append(vertex)
+                vertex = critical.get(vertex)
+            return CriticalPath(length, path[::-1],
+                                {vertex.name: start[vertex] for vertex in order},
+                                {vertex.name: latest[vertex] - start[vertex] for vertex in order})
+
+    def simulate(self, workers: int, weight: WeightMethodT = _unit_weight) -> float:
+        """Return the predicted time to process all vertices of this dag
+        (the *makespan*) by given number of ``workers``, each vertex taking
+        ``weight(vertex)`` time once all its supporters are processed. Ready
+        vertices are picked in order of the longest weighted path starting at
+        them (critical path list scheduling), as in ``critical_path()``.
+
+        Raise ``CycleDetected`` if the dag is cyclic.
+        """
+        if workers < 1:
+            raise ValueError(f"workers must be at least 1, not {workers}")
+        with self._lock:
+            order = self.topological_order()
+            cost = {vertex: weight(vertex) for vertex in order}
+            tail = {}
+            for vertex in reversed(order):
+                tail[vertex] = cost[vertex] + max(
+                    (tail[dependant] for dependant in vertex.direct_dependants()), default=0)
+            index = {vertex: idx for idx, vertex in enumerate(order)}
+            waiting = {vertex: len(vertex._supporters) for vertex in order}
+            ready = [(-tail[vertex], index[vertex]) for vertex in order if not waiting[vertex]]
+            heapq.heapify(ready)
+            running, clock = [], 0
+            while ready or running:
+                while ready and len(running) < workers:
+                    idx = heapq.heappop(ready)[1]
+                    heapq.heappush(running, (clock + cost[order[idx]], idx))
+                clock, idx = heapq.heappop(running)
+                for dependant in order[idx].direct_dependants():
+                    waiting[dependant] -= 1
+                    if not waiting[dependant]:
+                        heapq.heappush(ready, (-tail[dependant], index[dependant]))
+            return clock
+
+    @_instrumented('redundant_edges')
+    def redundant_edges(self) -> List[EdgeT]:
+        """Return the ``(dependant, supporter)`` name pairs of the edges
+        implied by others, i.e. to a supporter which is also an indirect
+        supporter of the dependant; see ``transitive_reduction()``.
+        Dependants are listed in topological order. Reachability is kept as
+        bitsets, see ``_redundant_edges()``.
+
+        Raise ``CycleDetected`` if the dag is cyclic.
+        """
+        with self._lock:
+            edges = _redundant_edges(self.topological_order(), Vertex.direct_supporters,
+                                     lambda vertex: len(vertex._dependants))
+            return [(vertex.name, supporter.name) for vertex, supporter in edges]
+
+    def transitive_reduction(self, in_place: bool = False) -> DepDag:
+        """Return a dag with the vertices of this one but only the edges not
+        implied by others, see ``redundant_edges()``: a clone of this dag or,
+        with ``in_place``, this dag itself, the redundant edges removed.
+        Both have the same supporters for each vertex, recursively.
+
+        Raise ``CycleDetected`` if the dag is cyclic.
+        """
+        with self._lock:
+            redundant = self.redundant_edges()
+            dag = self if in_place else self.clone()
+            dag.remove_edges(redundant)
+            return dag
+
+    def resolved_vertices(self) -> Iterable[Vertex]:
+        """Return a generator of all resolved vertices, ordered as created."""
+        memo = {}
+        return (vertex for vertex in self.all_vertices() if vertex._is_resolved(memo))
+
+    def unresolved_vertices(self) -> Iterable[Vertex]:
+        """Return a generator of all unresolved vertices, ordered as created."""
+        memo = {}
+        return (vertex for vertex in self.all_vertices() if not vertex._is_resolved(memo))
+
     def is_cyclic(self) -> bool:
         """Return ``True`` if this directed graph contains at least one cycle,
         ``False`` otherwise.
         """
-        safe_vertices = set()
+        return bool(self.find_cycle())
+
+    @_instrumented('find_cycle')
+    def find_cycle(self) -> List[Vertex]:
+        """Return a list of vertices forming a cycle, each depending on the
+        next one and the last one depending on the first one, or an empty
+        list if this dag is acyclic. Runs in linear time.
+        """
+        self._count_cycle_check()
+        with self._lock:
+            return _find_cycle(self.all_vertices(), self._counted(Vertex.direct_supporters))
+
+    def _insert_order(self, dependant: Vertex, supporter: Vertex,
+                      supporters_of: Callable = Vertex.direct_supporters,
+                      dependants_of: Callable = Vertex.direct_dependants) -> List[Vertex]:
+        """Update the topological order of the vertices (``Vertex._order``,
+        supporters first) for a new edge from ``dependant`` to ``supporter``
+        and return an empty list, or return the cycle the edge would close,
+        leaving the order valid. Dynamic topological sort of Pearce and
+        Kelly: if the edge breaks the order, only the vertices ordered
+        between its two ends are visited, and reordered.
+        @param supporters_of, dependants_of: the edges to search, if other
+            than those of the dag
+        """
+        if supporter is dependant:
+            return [dependant]
+        lower, upper = dependant._order, supporter._order
+        if upper < lower:
+            return []
+        self._count_cycle_check()
+        later = _search(dependant, self._counted(dependants_of),
+                        lambda node: node._order <= upper)
+        if supporter in later:
+            cycle, vertex = [dependant], supporter
+            while vertex is not dependant:
+                cycle.append(vertex)
+                vertex = later[vertex]
+            return cycle
+        earlier = _search(supporter, self._counted(supporters_of),
+                          lambda node: node._order > lower)
+        moved = sorted(earlier, key=_order_of) + sorted(later, key=_order_of)
+        for vertex, order in zip(moved, sorted(map(_order_of, moved))):
+            vertex._order = order
+        return []
+
+    def _order_edges(self, staged: Dict[Vertex, Dict[VertexNameT, Vertex]]) -> bool:
+        """Raise ``CycleDetected`` if the ``staged`` edges (not added yet)
+        would close a cycle. Small batches are ordered edge by edge, see
+        ``_insert_order()``; for bulk loads (at least a vertex per four
+        edges) a single search is cheaper, and ``True`` is returned: the
+        order must then be reset, once the edges are added.
+        """
+        if 4 * sum(map(len, staged.values())) >= len(self._vertices):
+            def staged_supporters_of(vertex):
+                return chain(vertex.direct_supporters(), staged.get(vertex, {}).values())
 
-        def check(vertex, visited_vertices):
-            nonlocal safe_vertices
+            self._count_cycle_check()
+            cycle = _find_cycle(staged, self._counted(staged_supporters_of))
+            if cycle:
+                raise CycleDetected("on adding edges", cycle)
+            return True
 
-            if vertex in visited_vertices:
-                return True
+        # edges ordered so far, searched along with those of the dag
+        supporters: Dict[Vertex, List[Vertex]] = {}
+        dependants: Dict[Vertex, List[Vertex]] = {}
 
-            if not vertex.direct_supporters() or vertex in safe_vertices:
-                safe_vertices |= visited_vertices
-                return False
+        def supporters_of(vertex):
+            return chain(vertex.direct_supporters(), supporters.get(vertex, ()))
 
-            visited_vertices.add(vertex)
-            return any(check(supporter, visited_vertices.copy())
-                       for supporter in vertex.direct_supporters())
+        def dependants_of(vertex):
+            return chain(vertex.direct_dependants(), dependants.get(vertex, ()))
 
-        return any(check(vertex, set()) for vertex in self.all_vertices())
+        for dependant, new_supporters in staged.items():
+            for supporter in new_supporters.values():
+                cycle = self._insert_order(dependant, supporter, supporters_of, dependants_of)
+                if cycle:
+                    raise CycleDetected("on adding edges", cycle)
+                supporters.setdefault(dependant, []).append(supporter)
+                dependants.setdefault(supporter, []).append(dependant)
+        return False
 
+    def _renumber(self) -> None:
+        """Reset the topological order of all vertices, see
+        ``_insert_order()``."""
+        levels = _levels(list(self._vertices.values()),
+                         Vertex.direct_supporters, Vertex.direct_dependants)
+        for order, vertex in enumerate(chain.from_iterable(levels)):
+            vertex._order = order
+        self._min_order, self._max_order = 0, len(self._vertices) - 1
+
+    def is_reachable(self, source: Vertex, target: Vertex) -> bool:
+        """Return ``True`` if ``target`` is ``source`` itself or one of its
+        supporters, recursively, ``False`` otherwise. Only the part of the
+        dag supporting ``source`` is visited.
+        """
+        return bool(self.supporting_path(source, target))
+
+    @_instrumented('supporting_path')
+    def supporting_path(self, source: Vertex, target: Vertex) -> List[Vertex]:
+        """Return a list of vertices leading from ``source`` to ``target``
+        (both included), each one being a direct supporter of the previous
+        one, or an empty list if ``target`` does not support ``source``.
+        """
+        supporters_of = self._counted(Vertex.direct_supporters)
+        parents = {source: None}
+        stack = [source]
+        while stack:
+            vertex = stack.pop()
+            if vertex is target:
+                path = []
+                while vertex is not None:
+                    path.append(vertex)
+                    vertex = parents[vertex]
+                return path[::-1]
+            for supporter in supporters_of(vertex):
+                if supporter not in parents:
+                    parents[supporter] = vertex
+                    stack.append(supporter)
+        return []
+
+    @_instrumented('clone')
     def clone(self, clone_payload_method: ClonePayloadMethodT = lambda p: p):
         """Clone this dag into a new one, having vertices with names
         and dependencies mirroring those of the original dag. Payload is
@@ -200,21 +1749,638 @@ class DepDag:
             ``clone_payload_method=copy.copy``.
         - To make a deep copy of the payload, use
            ``clone_payload_method=copy.deepcopy``.
+
+        The clone has the settings of this dag, e.g. ``fail_on_cycle``. For
+        cheap clones sharing the dag structure, see ``CompactDag.clone()``.
         """
-        dag_clone = DepDag()
+        return self._copy(list(self.all_vertices()), clone_payload_method)
 
-        for vert in self._vertices.values():
-            cloned_payload = clone_payload_method(vert.payload)
-            dag_clone.new_vertex(vert.name, cloned_payload)
+    def _copy(self, vertices: List[Vertex], clone_payload_method: ClonePayloadMethodT) -> DepDag:
+        """Return a new dag with the settings of this one, having given
+        vertices of this dag, the edges among them and their payloads,
+        cloned via ``clone_payload_method``."""
+        dag_clone = DepDag(
+            fail_on_cycle=self._fail_on_cycle,
+            cache_closures=self._closures is not None,
+            journal_size=None if self._journal is None else self._journal.maxlen,
+            thread_safe=self._thread_safe, probe_ttl=self._probe_ttl,
+            probe_batch=self._probe_batch)
 
-        for vert in self._vertices.values():
-            for supporter in vert.direct_supporters():
-                dag_clone[vert.name].depends_on(supporter.name)
+        with self._lock:
+            for vert in vertices:
+                cloned_payload = clone_payload_method(vert.payload)
+                dag_clone.new_vertex(vert.name, cloned_payload)
+
+            new_vertices = dag_clone._vertices
+            linked = []
+            for vert in vertices:
+                supporters = [new_vertices[name] for name in vert._supporters
+                              if name in new_vertices]
+                if supporters:
+                    new_vertices[vert.name]._link(supporters)
+                    linked.append((new_vertices[vert.name], supporters))
+            if dag_clone._fail_on_cycle:
+                dag_clone._renumber()
+            for vertex, supporters in linked:
+                dag_clone._notify_edges(EDGE_ADDED, vertex, supporters)
 
         return dag_clone
 
+    def subgraph(self, roots: Iterable[VertexNameT], direction: str = 'supporters') -> DagView:
+        """Return a read-only ``DagView`` of the vertices named ``roots`` and
+        all their supporters (or dependants, if ``direction`` is
+        ``'dependants'``), recursively, in a single pass. Vertices are
+        ordered as visited, depth-first, starting from the roots.
+
+        Raise ``KeyError`` if any of the roots does not exist.
+        """
+        if direction not in ('supporters', 'dependants'):
+            raise ValueError(f"invalid direction {direction!r}")
+        neighbours_of = (Vertex.direct_supporters if direction == 'supporters'
+                         else Vertex.direct_dependants)
+        members: Dict[Vertex, None] = {}
+        stack = [self._vertices[name] for name in roots][::-1]
+        while stack:
+            vertex = stack.pop()
+            if vertex not in members:
+                members[vertex] = None
+                stack.extend(reversed(list(neighbours_of(vertex))))
+        return DagView(self, members)
+
+    @_instrumented('compact')
+    def compact(self) -> CompactDag:
+        """Return a read-only ``CompactDag`` snapshot of this dag, sharing
+        the payload objects."""
+        with self._lock:
+            vertices = list(self.all_vertices())
+            ids = {vertex: idx for idx, vertex in enumerate(vertices)}
+            offsets, targets = array('q', [0]), array('i')
+            for vertex in vertices:
+                targets.extend(ids[supporter] for supporter in vertex.direct_supporters())
+                offsets.append(len(targets))
+            return CompactDag(names_list(vertices), offsets, targets,
+                              [vertex.payload for vertex in vertices])
+
+    def save(self, path: str, encode_payload: EncodePayloadMethodT = pickle.dumps) -> None:
+        """Save this dag to a binary file, see ``CompactDag.save()``."""
+        self.compact().save(path, encode_payload)
+
+    def share(self, name: str = None,
+              encode_payload: EncodePayloadMethodT = pickle.dumps) -> SharedDag:
+        """Freeze this dag into shared memory, see ``CompactDag.share()``."""
+        return self.compact().share(name, encode_payload)
+
+    @classmethod
+    def load(cls, path: str, decode_payload: DecodePayloadMethodT = pickle.loads,
+             fail_on_cycle: bool = False) -> DepDag:
+        """Load a dag saved via ``save()``, see ``CompactDag.load()``."""
+        compact = CompactDag.load(path, decode_payload, use_mmap=False)
+        try:
+            return compact.thaw(fail_on_cycle)
+        finally:
+            compact.close()
+
     def ensure_not_cyclic(self, message: str = 'graph is cyclic') -> None:
         """Raise ``CycleDetected`` with ``message`` if cyclic check returns
         ``True``, otherwise pass silently."""
-        if self.is_cyclic():
-            raise CycleDetected(message)
+        cycle = self.find_cycle()
+        if cycle:
+            raise CycleDetected(message, cycle)
+
+
+class DagView:
+    """A read-only view of some of the vertices of a ``DepDag`` (see
+    ``DepDag.subgraph()``) and the edges among them, with no copying.
+
+    The vertices are those of the original dag: their own methods, e.g.
+    ``direct_supporters()`` or ``is_resolved()``, still take into account
+    vertices not in the view.
+    """
+
+    __slots__ = ('_dag', '_members')
+
+    def __init__(self, dag: DepDag, members: Dict[Vertex, None]):
+        self._dag: DepDag = dag
+        self._members: Dict[Vertex, None] = members
+
+    def __contains__(self, item):
+        return self._dag._vertices.get(item) in self._members
+
+    def __len__(self):
+        return len(self._members)
+
+    def __iter__(self):
+        return ((vertex.name, vertex) for vertex in self._members)
+
+    def __getitem__(self, name: VertexNameT) -> Vertex:
+        if name not in self:
+            raise KeyError(name)
+        return self._dag[name]
+
+    def _supporters_of(self, vertex: Vertex) -> List[Vertex]:
+        return [supporter for supporter in vertex.direct_supporters()
+                if supporter in self._members]
+
+    def all_vertices(self) -> Iterable[Vertex]:
+        """Return an iterable of all vertices within this view."""
+        return self._members.keys()
+
+    def is_cyclic(self) -> bool:
+        """Return ``True`` if this view contains at least one cycle,
+        ``False`` otherwise.
+        """
+        return bool(self.find_cycle())
+
+    def find_cycle(self) -> List[Vertex]:
+        """Return a list of vertices forming a cycle within this view, see
+        ``DepDag.find_cycle()``."""
+        return _find_cycle(self._members, self._supporters_of)
+
+    def is_resolved(self) -> bool:
+        """Return ``True`` if all vertices within this view are resolved."""
+        memo = {}
+        return all(vertex._is_resolved(memo) for vertex in self._members)
+
+    def resolved_vertices(self) -> Iterable[Vertex]:
+        """Return a generator of the resolved vertices within this view."""
+        memo = {}
+        return (vertex for vertex in self._members if vertex._is_resolved(memo))
+
+    def unresolved_vertices(self) -> Iterable[Vertex]:
+        """Return a generator of the unresolved vertices within this view."""
+        memo = {}
+        return (vertex for vertex in self._members if not vertex._is_resolved(memo))
+
+    def topological_order(self) -> List[Vertex]:
+        """Return a list of the vertices within this view ordered so that
+        each vertex comes after all its supporters within the view.
+
+        Raise ``CycleDetected`` if the view is cyclic.
+        """
+        levels = _levels(list(self._members), Vertex.direct_supporters,
+                         Vertex.direct_dependants)
+        if levels is None:
+            raise CycleDetected('graph is cyclic', self.find_cycle())
+        return [vertex for level in levels for vertex in level]
+
+    def materialize(self, clone_payload_method: ClonePayloadMethodT = lambda p: p) -> DepDag:
+        """Return a new, standalone ``DepDag`` with the vertices and edges
+        of this view; see ``DepDag.clone()`` for ``clone_payload_method``."""
+        return self._dag._copy(list(self._members), clone_payload_method)
+
+
+class _PayloadOverlay:
+    """Copy-on-write payloads list: items are read from a base list, shared
+    and never changed, unless set, in which case they go to a private dict.
+    """
+
+    __slots__ = ('_base', '_changes')
+
+    def __init__(self, base: List[PayloadT], changes: Dict[int, PayloadT] = None):
+        self._base: List[PayloadT] = base
+        self._changes: Dict[int, PayloadT] = changes or {}
+
+    def __len__(self):
+        return len(self._base)
+
+    def __getitem__(self, index: int) -> PayloadT:
+        if index in self._changes:
+            return self._changes[index]
+        return self._base[index]
+
+    def __setitem__(self, index: int, payload: PayloadT) -> None:
+        self._base[index]  # raise IndexError on invalid index
+        self._changes[index] = payload
+
+    def __iter__(self):
+        return (self[index] for index in range(len(self._base)))
+
+    def copy(self) -> _PayloadOverlay:
+        return _PayloadOverlay(self._base, dict(self._changes))
+
+
+class CompactVertex:
+    """A vertex of a ``CompactDag``: a lightweight view created on access,
+    mirroring the read-only part of the ``Vertex`` API. Payload assignment
+    is allowed.
+    """
+
+    __slots__ = ('_dag', '_id')
+
+    def __init__(self, dag: CompactDag, vertex_id: int):
+        self._dag: CompactDag = dag
+        self._id: int = vertex_id
+
+    def __eq__(self, other) -> bool:
+        return (isinstance(other, CompactVertex)
+                and self._dag is other._dag and self._id == other._id)
+
+    def __hash__(self) -> int:
+        return hash((id(self._dag), self._id))
+
+    def __repr__(self) -> str:
+        return f"<CompactVertex(name={self.name!r}) object at 0x{id(self):x})>"
+
+    @property
+    def name(self) -> VertexNameT:
+        return self._dag._names[self._id]
+
+    @property
+    def payload(self) -> PayloadT:
+        return self._dag._payloads[self._id]
+
+    @payload.setter
+    def payload(self, payload: PayloadT) -> None:
+        self._dag._payloads[self._id] = payload
+
+    def has_payload(self) -> bool:
+        return self._dag._has_payload(self._id)
+
+    def depends_on(self, *vertices: VertexNameT) -> None:
+        raise NotImplementedError("cannot add dependencies to a compact dag")
+
+    def direct_supporters(self) -> List[CompactVertex]:
+        """Return a list of supporters directly related to this vertex."""
+        return self._dag._vertices(self._dag._supporter_ids(self._id))
+
+    def all_supporters(self, unique: bool = False) -> Iterable[CompactVertex]:
+        """Return a generator iterating over all supporters of this vertex,
+        retrieved recursively, depth-first, left-to-right; see
+        ``Vertex.all_supporters()``.
+        """
+        vertex_ids = _walk(self._id, self._dag._supporter_ids, unique)
+        return (CompactVertex(self._dag, vertex_id) for vertex_id in vertex_ids)
+
+    def is_resolved(self) -> bool:
+        """Return ``True`` if this vertex and all its supporters, recursively,
+        have payload."""
+        has_payload = self._dag._has_payload
+        return has_payload(self._id) and all(
+            has_payload(vertex_id)
+            for vertex_id in _walk(self._id, self._dag._supporter_ids, unique=True))
+
+
+class CompactDag:
+    """A read-only, memory-compact snapshot of a ``DepDag`` (see
+    ``DepDag.compact()``), offering the same querying API.
+
+    Vertex names are interned to integer ids, in creation order, and the
+    supporters of all vertices are stored in two flat arrays, compressed
+    sparse row (CSR) style: the ids of the supporters of vertex ``i`` are
+    ``targets[offsets[i]:offsets[i + 1]]``. Traversals run on integer ids
+    and vertex objects (``CompactVertex``) are only created on access.
+
+    With the ``numpy`` extra installed, the dag can be exported to a SciPy
+    sparse matrix and analysed via vectorized operations, see
+    ``to_csr_matrix()``.
+    """
+
+    __slots__ = ('_names', '_ids', '_offsets', '_targets', '_payloads', '_buffer')
+
+    def __init__(self, names: List[VertexNameT], offsets: Sequence[int], targets: Sequence[int],
+                 payloads: List[PayloadT] = None, buffer=None):
+        """Initialize the CompactDag.
+
+        @param offsets, targets: the CSR edge arrays, e.g. ``array`` objects
+           or memory views cast to integer format.
+        @param buffer: the object backing ``offsets`` and ``targets``, if
+           any, to be closed by ``close()``.
+        """
+        self._names: List[VertexNameT] = names
+        self._ids: Dict[VertexNameT, int] = {name: idx for idx, name in enumerate(names)}
+        self._offsets: Sequence[int] = offsets
+        self._targets: Sequence[int] = targets
+        self._payloads: List[PayloadT] = payloads or [None] * len(names)
+        self._buffer = buffer
+
+    def __contains__(self, item):
+        return item in self._ids
+
+    def __len__(self):
+        return len(self._names)
+
+    def __iter__(self):
+        return ((name, CompactVertex(self, idx)) for idx, name in enumerate(self._names))
+
+    def __getattr__(self, name: VertexNameT) -> CompactVertex:
+        if name not in self._ids:
+            raise AttributeError(f"CompactDag object has no attribute {name!r}")
+        return CompactVertex(self, self._ids[name])
+
+    def __getitem__(self, name: VertexNameT) -> CompactVertex:
+        return CompactVertex(self, self._ids[name])
+
+    def _supporter_ids(self, vertex_id: int) -> Iterable[int]:
+        return self._targets[self._offsets[vertex_id]:self._offsets[vertex_id + 1]]
+
+    def _vertices(self, vertex_ids: Iterable[int]) -> List[CompactVertex]:
+        return [CompactVertex(self, vertex_id) for vertex_id in vertex_ids]
+
+    def _has_payload(self, vertex_id: int) -> bool:
+        payload = self._payloads[vertex_id]
+        if payload is None:
+            return False
+        if callable(payload):
+            return payload()
+        return True
+
+    def all_vertices(self) -> List[CompactVertex]:
+        """Return a list of all vertices within this dag, ordered as created."""
+        return self._vertices(range(len(self._names)))
+
+    def is_cyclic(self) -> bool:
+        """Return ``True`` if this directed graph contains at least one cycle,
+        ``False`` otherwise.
+        """
+        return bool(_find_cycle(range(len(self._names)), self._supporter_ids))
+
+    def find_cycle(self) -> List[CompactVertex]:
+        """Return a list of vertices forming a cycle, see ``DepDag.find_cycle()``."""
+        return self._vertices(_find_cycle(range(len(self._names)), self._supporter_ids))
+
+    def _pack(self, encode_payload: EncodePayloadMethodT) -> List[bytes]:
+        """Return the binary representation of this dag as a list of chunks."""
+        names = pickle.dumps(self._names, pickle.HIGHEST_PROTOCOL)
+        payload_offsets, payloads = array('q', [0]), []
+        for payload in self._payloads:
+            encoded = None if payload is None else encode_payload(payload)
+            payloads.append(encoded or b'')
+            payload_offsets.append(payload_offsets[-1] + len(payloads[-1]))
+        header = _HEADER.pack(_MAGIC, _BYTE_ORDER_MARK, 0, len(self._names),
+                              len(self._targets), len(names), payload_offsets[-1])
+        return [header, array('q', self._offsets).tobytes(),
+                _padded(array('i', self._targets).tobytes()), _padded(names),
+                payload_offsets.tobytes(), *payloads]
+
+    def save(self, path: str, encode_payload: EncodePayloadMethodT = pickle.dumps) -> None:
+        """Save this dag to a binary file at ``path``: a names table (pickled)
+        and the edge arrays, plus the payloads, each one encoded to bytes via
+        ``encode_payload``. A payload encoded to ``None`` (or empty bytes) is
+        not saved; e.g. use ``encode_payload=lambda p: None`` to save no
+        payloads at all.
+        """
+        with open(path, 'wb') as file:
+            for chunk in self._pack(encode_payload):
+                file.write(chunk)
+
+    def share(self, name: str = None,
+              encode_payload: EncodePayloadMethodT = pickle.dumps) -> SharedDag:
+        """Copy this dag, in the binary format of ``save()``, to a new
+        ``multiprocessing.shared_memory`` block (named ``name``, or a
+        generated name) and return a ``SharedDag`` handle to it, which
+        other processes can attach to by name, see ``SharedDag.attach()``.
+        Only the edge arrays are then shared, see ``SharedDag``.
+
+        Raise ``ImportError`` before Python 3.8.
+        """
+        shared_memory = _shared_memory()
+        chunks = self._pack(encode_payload)
+        shm = shared_memory.SharedMemory(name, create=True, size=max(sum(map(len, chunks)), 1))
+        position = 0
+        for chunk in chunks:
+            shm.buf[position:position + len(chunk)] = chunk
+            position += len(chunk)
+        dag = CompactDag._unpack(shm.buf, lambda data: None, shm)
+        dag._payloads = list(self._payloads)
+        return SharedDag(shm, dag)
+
+    @classmethod
+    def load(cls, path: str, decode_payload: DecodePayloadMethodT = pickle.loads,
+             use_mmap: bool = True) -> CompactDag:
+        """Load a dag saved via ``save()``, decoding the payloads via
+        ``decode_payload``. Names are unpickled, so only load trusted files.
+
+        With ``use_mmap`` the edge arrays are not read but memory-mapped,
+        read-only, so that processes loading the same file share them;
+        ``close()`` unmaps the file.
+        """
+        with open(path, 'rb') as file:
+            if not use_mmap:
+                return cls._unpack(file.read(), decode_payload)
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls._unpack(buffer, decode_payload, buffer)
+
+    @classmethod
+    def _unpack(cls, data, decode_payload: DecodePayloadMethodT, owner=None) -> CompactDag:
+        """Create a dag from its binary representation ``data``, referring to
+        (not copying) the edge arrays within it."""
+        with memoryview(data) as view:
+            magic, mark, _, size, edges, names_size, payloads_size = \
+                _HEADER.unpack_from(view)
+            if magic != _MAGIC or mark != _BYTE_ORDER_MARK:
+                raise ValueError("not a depdag file or incompatible byte order")
+            sections = _split(view, _HEADER.size, [
+                8 * (size + 1), 4 * edges, names_size, 8 * (size + 1), payloads_size])
+            offsets, targets = sections[0].cast('q'), sections[1].cast('i')
+            names = pickle.loads(sections[2])
+            payload_offsets = sections[3].cast('q')
+            payloads = [
+                decode_payload(sections[4][start:end].tobytes()) if end > start else None
+                for start, end in zip(payload_offsets, payload_offsets[1:])]
+            for section in sections:
+                section.release()
+            payload_offsets.release()
+        return cls(names, offsets, targets, payloads, owner)
+
+    def close(self) -> None:
+        """Release the buffer backing the edge arrays, if any (e.g. the
+        memory-mapped file). The dag is unusable afterwards."""
+        for view in (self._offsets, self._targets):
+            if isinstance(view, memoryview):
+                view.release()
+        if self._buffer is not None:
+            self._buffer.close()
+            self._buffer = None
+
+    def clone(self, clone_payload_method: ClonePayloadMethodT = None) -> CompactDag:
+        """Clone this dag into a new one sharing the names table and edge
+        arrays with it (these are never changed), in constant time.
+
+        Payloads are copied on write: both dags read those of this dag as of
+        the clone time until they are assigned new ones. Alternatively, all
+        payloads of the clone are set upfront via ``clone_payload_method``,
+        as with ``DepDag.clone()``.
+        """
+        if not isinstance(self._payloads, _PayloadOverlay):
+            self._payloads = _PayloadOverlay(self._payloads)
+        if clone_payload_method is None:
+            payloads = self._payloads.copy()
+        else:
+            payloads = [clone_payload_method(payload) for payload in self._payloads]
+        dag_clone = CompactDag.__new__(CompactDag)
+        dag_clone._names, dag_clone._ids = self._names, self._ids
+        dag_clone._offsets, dag_clone._targets = self._offsets, self._targets
+        dag_clone._payloads, dag_clone._buffer = payloads, None
+        return dag_clone
+
+    def thaw(self, fail_on_cycle: bool = False) -> DepDag:
+        """Return a new, mutable ``DepDag`` with the vertices, edges and
+        payloads of this one."""
+        dag = DepDag(fail_on_cycle)
+        for name, payload in zip(self._names, self._payloads):
+            dag.new_vertex(name, payload)
+        names = self._names
+        dag.add_edges((name, names[supporter_id])
+                      for vertex_id, name in enumerate(names)
+                      for supporter_id in self._supporter_ids(vertex_id))
+        return dag
+
+    def to_csr_matrix(self):
+        """Return the adjacency matrix of this dag as a boolean
+        ``scipy.sparse.csr_matrix``, having row ``i`` and column ``j`` set if
+        vertex ``i`` depends on vertex ``j``, vertices being numbered in
+        creation order. The matrix shares the edge arrays of this dag where
+        possible. Needs the ``numpy`` extra.
+        """
+        numpy, sparse = _numpy_and_sparse()
+        size = len(self._names)
+        indptr = numpy.asarray(self._offsets, dtype=numpy.int64)
+        indices = numpy.asarray(self._targets, dtype=numpy.int32)
+        data = numpy.ones(len(indices), dtype=bool)
+        return sparse.csr_matrix((data, indices, indptr), shape=(size, size))
+
+    def reachable(self, sources: Iterable[VertexNameT],
+                  direction: str = 'supporters') -> Dict[VertexNameT, List[VertexNameT]]:
+        """Return a dict mapping each of the ``sources`` names to the names of
+        all its supporters (or dependants, if ``direction`` is
+        ``'dependants'``), recursively, in creation order. All sources are
+        searched at once, via sparse matrix products. Needs the ``numpy``
+        extra.
+        """
+        if direction not in ('supporters', 'dependants'):
+            raise ValueError(f"invalid direction {direction!r}")
+        sources = list(sources)
+        adjacency = self.to_csr_matrix()
+        if direction == 'dependants':
+            adjacency = adjacency.T.tocsr()
+        ids, names, result = [self._ids[name] for name in sources], self._names, {}
+        for start, end in _chunks(len(names), len(ids)):
+            reached = _reach(adjacency[ids[start:end]], adjacency)
+            for row, name in enumerate(sources[start:end]):
+                result[name] = [names[idx] for idx in reached[row].nonzero()[0].tolist()]
+        return result
+
+    def degrees(self) -> Dict[VertexNameT, Tuple[int, int]]:
+        """Return a dict mapping the name of each vertex to its numbers of
+        direct supporters and direct dependants. Needs the ``numpy`` extra.
+        """
+        numpy, _ = _numpy_and_sparse()
+        supporters = numpy.diff(numpy.asarray(self._offsets, dtype=numpy.int64))
+        dependants = numpy.bincount(numpy.asarray(self._targets, dtype=numpy.int32),
+                                    minlength=len(self._names))
+        return dict(zip(self._names, zip(supporters.tolist(), dependants.tolist())))
+
+    def levels(self) -> List[List[CompactVertex]]:
+        """Return the vertices of this dag grouped into levels, see
+        ``DepDag.levels()``; each level is computed at once, via array
+        operations. Needs the ``numpy`` extra.
+
+        Raise ``CycleDetected`` if the dag is cyclic.
+        """
+        numpy, _ = _numpy_and_sparse()
+        dependants = self.to_csr_matrix().T.tocsr()
+        indptr, indices = dependants.indptr, dependants.indices
+        pending = numpy.diff(numpy.asarray(self._offsets, dtype=numpy.int64))
+        level = numpy.full(len(self._names), -1, dtype=numpy.int64)
+        frontier, depth = numpy.flatnonzero(pending == 0), 0
+        while frontier.size:
+            level[frontier] = depth
+            sizes = indptr[frontier + 1] - indptr[frontier]
+            positions = numpy.arange(sizes.sum()) + numpy.repeat(
+                indptr[frontier] - numpy.cumsum(sizes) + sizes, sizes)
+            targets = indices[positions]
+            numpy.subtract.at(pending, targets, 1)
+            frontier, depth = numpy.unique(targets[pending[targets] == 0]), depth + 1
+        if (level < 0).any():
+            raise CycleDetected('graph is cyclic', self.find_cycle())
+        order = numpy.argsort(level, kind='stable')
+        bounds = numpy.searchsorted(level[order], numpy.arange(depth + 1))
+        return [self._vertices(order[start:end].tolist())
+                for start, end in zip(bounds, bounds[1:])]
+
+    def transitive_reduction(self) -> CompactDag:
+        """Return a new ``CompactDag`` with the vertices and payloads of this
+        one, but only the edges not implied by others: an edge from a
+        dependant to a supporter is dropped if the latter is also an
+        indirect supporter of the former. Runs on integer ids, with
+        reachability kept as bitsets, as ``DepDag.redundant_edges()``.
+
+        Raise ``CycleDetected`` if the dag is cyclic.
+        """
+        size = len(self._names)
+        dependants = [[] for _ in range(size)]
+        for vertex_id in range(size):
+            for supporter_id in self._supporter_ids(vertex_id):
+                dependants[supporter_id].append(vertex_id)
+        levels = _levels(list(range(size)), self._supporter_ids, dependants.__getitem__)
+        if levels is None:
+            raise CycleDetected('graph is cyclic', self.find_cycle())
+        redundant = set(_redundant_edges([vertex_id for level in levels for vertex_id in level],
+                                         self._supporter_ids,
+                                         lambda vertex_id: len(dependants[vertex_id])))
+        offsets, targets = array('q', [0]), array('i')
+        for vertex_id in range(size):
+            targets.extend(supporter_id for supporter_id in self._supporter_ids(vertex_id)
+                           if (vertex_id, supporter_id) not in redundant)
+            offsets.append(len(targets))
+        return CompactDag(self._names, offsets, targets, list(self._payloads))
+
+
+class SharedDag:
+    """A handle to a read-only dag stored in shared memory (see
+    ``CompactDag.share()``), giving access to it as a ``CompactDag``
+    (``dag``) whose edge arrays are read, with no copying, from the shared
+    memory block. The names table is unpickled, and indexed by name, and
+    the payloads decoded, into private copies in each process: attaching
+    takes time and memory linear in the number of vertices. Payloads are
+    assigned in the private list.
+
+    Each process should ``close()`` its handle when done (or use it as a
+    context manager); the creating one should also ``unlink()`` the block.
+    """
+
+    __slots__ = ('_shm', '_dag')
+
+    def __init__(self, shm, dag: CompactDag):
+        self._shm = shm
+        self._dag: CompactDag = dag
+
+    @classmethod
+    def attach(cls, name: str, decode_payload: DecodePayloadMethodT = pickle.loads) -> SharedDag:
+        """Attach to the shared dag having given ``name``, decoding the
+        payloads via ``decode_payload``. Names are unpickled, so only attach
+        to trusted blocks.
+
+        Raise ``ImportError`` before Python 3.8.
+        """
+        shm = _shared_memory().SharedMemory(name)
+        try:
+            return cls(shm, CompactDag._unpack(shm.buf, decode_payload, shm))
+        except BaseException:
+            shm.close()
+            raise
+
+    @property
+    def name(self) -> str:
+        """The name of the shared memory block, to attach to."""
+        return self._shm.name
+
+    @property
+    def dag(self) -> CompactDag:
+        return self._dag
+
+    def close(self) -> None:
+        """Detach from the shared memory block; ``dag`` is unusable
+        afterwards."""
+        self._dag.close()
+
+    def unlink(self) -> None:
+        """Have the shared memory block destroyed once all processes have
+        closed it."""
+        self._shm.unlink()
+
+    def __enter__(self) -> SharedDag:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -29,6 +29,9 @@ setup(
     include_package_data=True,
     zip_safe=False,
     install_requires=[],
+    extras_require={
+        'numpy': ['numpy', 'scipy'],
+    },
     python_requires='>=3.7, <4',
     tests_require=[],
     setup_requires=[],
@@ -0,0 +1,11 @@
+from depdag import DepDag
+
+
+def diamond_dag(**kwargs) -> DepDag:
+    """Return a ``DepDag`` created with ``kwargs``, where ``a`` depends on
+    ``b`` and ``c``, both depending on ``d``."""
+    dag = DepDag(**kwargs)
+    dag.a.depends_on('b', 'c')
+    dag.b.depends_on('d')
+    dag.c.depends_on('d')
+    return dag
@@ -0,0 +1,241 @@
+"""
+depdag benchmark suite.
+
+Times the main operations of DepDag over several graph shapes and sizes and
+records, for each one, the best time per call out of a few runs and the peak
+memory allocated (via tracemalloc, in a separate call). Dags are built both
+in the order of the edges of each shape, dependants first, and supporters
+first. With numpy and scipy installed, the sparse matrix methods of
+CompactDag are timed too, along with their pure-Python counterparts. Results
+are printed and can be saved as JSON, then compared with those of another
+commit:
+
+ $ PYTHONPATH=. python tests/benchmarks.py --output before.json
+ $ git checkout <other commit>
+ $ PYTHONPATH=. python tests/benchmarks.py --compare before.json
+
+Comparison exits with status 1 if any operation got slower than the
+``--threshold`` ratio.
+"""
+
+import argparse
+import gc
+import json
+import platform
+import random
+import sys
+import tracemalloc
+from functools import partial
+from timeit import Timer
+
+from depdag import DepDag
+
+
+def chain(size):
+    """Each vertex depends on the next one."""
+    return [(idx, idx + 1) for idx in range(size - 1)], 0
+
+
+def fan_in(size):
+    """One vertex depends on all others."""
+    return [(0, idx) for idx in range(1, size)], 0
+
+
+def fan_out(size):
+    """All vertices but one depend on that one, and a root depends on all."""
+    edges = [(idx, 1) for idx in range(2, size)]
+    return edges + [(0, idx) for idx in range(2, size)], 0
+
+
+def diamond(size):
+    """A lattice of diamonds: each vertex of a row depends on two adjacent
+    vertices of the next row."""
+    width = max(2, int(size ** 0.5))
+    edges = []
+    for idx in range(size - width):
+        row, col = divmod(idx, width)
+        below = (row + 1) * width
+        edges.append((idx, below + col))
+        edges.append((idx, below + (col + 1) % width))
+    return edges, 0
+
+
+def random_dag(size, degree=3, seed=42):
+    """Each vertex depends on up to ``degree`` random vertices created after
+    it (having higher numbers), so that the graph is acyclic."""
+    rand = random.Random(seed)
+    edges = [(idx, rand.randrange(idx + 1, size))
+             for idx in range(size - 1) for _ in range(degree)]
+    return edges, 0
+
+
+SHAPES = {
+    'chain': chain,
+    'fan_in': fan_in,
+    'fan_out': fan_out,
+    'diamond': diamond,
+    'random': random_dag,
+}
+
+
+def supporters_first(edges):
+    """Return ``edges`` ordered so that those of each supporter come before
+    those of its dependants: each supporter has all its supporters already
+    when linked, as when a dag is built bottom-up."""
+    order = DepDag.from_edges(edges).topological_order()
+    position = {vertex.name: idx for idx, vertex in enumerate(order)}
+    return sorted(edges, key=lambda edge: position[edge[0]])
+
+
+def build(edges, **kwargs):
+    dag = DepDag(**kwargs)
+    for dependant, supporter in edges:
+        dag[dependant].depends_on(supporter)
+    return dag
+
+
+def resolved(edges):
+    dag = DepDag.from_edges(edges)
+    for vertex in dag.all_vertices():
+        vertex.payload = vertex.name
+    return dag
+
+
+def volatile(edges):
+    dag = resolved(edges)
+    for vertex in dag.all_vertices():
+        if not vertex._supporters:
+            vertex.payload = lambda: True
+    return dag
+
+
+def all_supporters(edges, root):
+    vertex = DepDag.from_edges(edges)[root]
+    return lambda: list(vertex.all_supporters(unique=True))
+
+
+def reachable(edges, root, sparse=False, sources=500):
+    """Return the supporters of ``sources`` vertices at once, spread over
+    the dag, via ``CompactDag.reachable()`` or ``all_supporters()``."""
+    dag = DepDag.from_edges(edges)
+    names = [name for name, _ in dag][::max(1, len(dag) // sources)]
+    if sparse:
+        return partial(dag.compact().reachable, names)
+    return lambda: [list(dag[name].all_supporters(unique=True)) for name in names]
+
+
+# Each operation takes the edges and the root (the vertex to query) of a
+# shape and returns a callable to be timed; preparation is not timed.
+OPERATIONS = {
+    'depends_on': lambda edges, root: partial(build, edges),
+    'depends_on_fail_on_cycle': lambda edges, root: partial(build, edges, fail_on_cycle=True),
+    'depends_on_supporters_first': lambda edges, root: partial(build, supporters_first(edges)),
+    'depends_on_fail_on_cycle_supporters_first':
+        lambda edges, root: partial(build, supporters_first(edges), fail_on_cycle=True),
+    'add_edges': lambda edges, root: lambda: DepDag.from_edges(edges),
+    'is_cyclic': lambda edges, root: DepDag.from_edges(edges).is_cyclic,
+    'all_supporters': all_supporters,
+    'is_resolved': lambda edges, root: resolved(edges)[root].is_resolved,
+    'is_resolved_volatile': lambda edges, root: volatile(edges)[root].is_resolved,
+    'clone': lambda edges, root: resolved(edges).clone,
+    'topological_order': lambda edges, root: DepDag.from_edges(edges).topological_order,
+    'levels': lambda edges, root: DepDag.from_edges(edges).levels,
+    'reachable': reachable,
+    'transitive_reduction': lambda edges, root: DepDag.from_edges(edges).transitive_reduction,
+    'transitive_reduction_compact':
+        lambda edges, root: DepDag.from_edges(edges).compact().transitive_reduction,
+}
+
+try:
+    import scipy  # noqa: F401
+    OPERATIONS['reachable_sparse'] = partial(reachable, sparse=True)
+    OPERATIONS['levels_sparse'] = lambda edges, root: DepDag.from_edges(edges).compact().levels
+except ImportError:
+    pass
+
+# Numbers of calls timed per run, for operations too fast to time one call.
+NUMBERS = {'is_resolved': 100000}
+
+
+def measure(operation, edges, root, repeat, number=1):
+    """Return the best time per call out of ``repeat`` runs of ``number``
+    calls each of ``operation``, and the peak memory allocated by one more
+    call. The garbage collector is left enabled."""
+    best = None
+    for _ in range(repeat):
+        elapsed = Timer(operation(edges, root), 'gc.enable()', globals={'gc': gc}).timeit(
+            number) / number
+        best = elapsed if best is None else min(best, elapsed)
+    run = operation(edges, root)
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def run_benchmarks(shapes, sizes, operations, repeat):
+    results = []
+    for size in sizes:
+        for shape in shapes:
+            edges, root = SHAPES[shape](size)
+            for name in operations:
+                seconds, peak = measure(OPERATIONS[name], edges, root, repeat,
+                                        NUMBERS.get(name, 1))
+                result = {'shape': shape, 'size': size, 'operation': name,
+                          'seconds': seconds, 'peak_bytes': peak}
+                results.append(result)
+                print(f"{shape:>8} {size:>8} {name:<42} {seconds:10.4g} sec."
+                      f" {peak / 2 ** 20:10.2f} MiB", flush=True)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Print the time ratio of each result to the baseline one and return
+    ``True`` if none exceeds ``threshold``."""
+    key = ('shape', 'size', 'operation')
+    before = {tuple(result[k] for k in key): result for result in baseline['results']}
+    ok = True
+    for result in results:
+        old = before.get(tuple(result[k] for k in key))
+        if old is None or not old['seconds']:
+            continue
+        ratio = result['seconds'] / old['seconds']
+        memory = result['peak_bytes'] / max(old['peak_bytes'], 1)
+        slower = ratio > threshold
+        ok = ok and not slower
+        print(f"{result['shape']:>8} {result['size']:>8} {result['operation']:<42}"
+              f" time x{ratio:6.2f}  memory x{memory:6.2f}{'  SLOWER' if slower else ''}")
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--shapes', nargs='+', choices=sorted(SHAPES), default=list(SHAPES))
+    parser.add_argument('--sizes', nargs='+', type=int, default=[1000, 10000, 100000],
+                        help="numbers of vertices, e.g. up to 1000000")
+    parser.add_argument('--operations', nargs='+', choices=sorted(OPERATIONS),
+                        default=list(OPERATIONS))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help="save the results as JSON to this file")
+    parser.add_argument('--compare', help="compare to the JSON results in this file")
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help="max time ratio to the compared results")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.shapes, args.sizes, args.operations, args.repeat)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({'python': platform.python_version(), 'results': results},
+                      file, indent=1)
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        return 0 if compare(results, baseline, args.threshold) else 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
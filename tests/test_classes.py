@@ -2,9 +2,33 @@
 depdag classes unit tests.
 """
 
+import io
+import os
+import random
+import sys
+import tempfile
+import threading
 import unittest
+from concurrent.futures import ProcessPoolExecutor
 
-from depdag import Vertex, DepDag, names_list, CycleDetected
+from depdag import Vertex, DepDag, DagView, CompactDag, CompactVertex, names_list, CycleDetected
+from depdag import Rebuild, CriticalPath, Stats, SharedDag
+from depdag import Change, VERTEX_CREATED, EDGE_ADDED, PAYLOAD_SET, PAYLOAD_CLEARED
+from depdag import EDGE_REMOVED, VERTEX_REMOVED
+from tests import diamond_dag
+
+try:
+    import scipy
+except ImportError:
+    scipy = None
+
+
+def query_shared_dag(name):
+    with SharedDag.attach(name) as shared:
+        dag = shared.dag
+        dag.c.payload = 'payload-c-in-worker'
+        return (names_list(dag.a.all_supporters(unique=True)), dag.b.payload,
+                dag.a.is_resolved(), dag.b.is_resolved())
 
 
 class TestVertex(unittest.TestCase):
@@ -83,6 +107,135 @@ class TestVertex(unittest.TestCase):
         self.assertTrue(a.is_resolved())
         self.assertTrue(b.is_resolved())
 
+    def test_direct_dependants(self):
+        dag = DepDag()
+        dag.a.depends_on('c')
+        dag.b.depends_on('c', 'd')
+        self.assertEqual(['a', 'b'], names_list(dag.c.direct_dependants()))
+        self.assertEqual(['b'], names_list(dag.d.direct_dependants()))
+        self.assertEqual([], names_list(dag.a.direct_dependants()))
+
+    def test_all_dependants(self):
+        dag = DepDag()
+        dag.a.depends_on('b', 'c')
+        dag.b.depends_on('d')
+        dag.c.depends_on('d')
+        dag.e.depends_on('a')
+        self.assertEqual(['b', 'c', 'a', 'e'], names_list(dag.d.all_dependants()))
+        self.assertEqual([], names_list(dag.e.all_dependants()))
+
+    def test_is_resolved__supporter_added_later(self):
+        dag = DepDag()
+        dag.new_vertex('a', 'payload-a')
+        dag.new_vertex('b', 'payload-b')
+        dag.a.depends_on('b')
+        self.assertTrue(dag.a.is_resolved())
+        dag.b.depends_on('c')
+        self.assertFalse(dag.a.is_resolved())
+        dag.c.payload = 'payload-c'
+        self.assertTrue(dag.a.is_resolved())
+        dag.c.payload = None
+        self.assertFalse(dag.a.is_resolved())
+
+    def test_is_resolved__callable_payload_is_volatile(self):
+        dag = DepDag()
+        ready = []
+        dag.new_vertex('a', 'payload-a')
+        dag.new_vertex('b', lambda: bool(ready))
+        dag.a.depends_on('b')
+        self.assertFalse(dag.a.is_resolved())
+        ready.append(True)
+        self.assertTrue(dag.a.is_resolved())
+        ready.clear()
+        self.assertFalse(dag.a.is_resolved())
+
+    def create_probed_dag(self, **kwargs):
+        dag = DepDag(**kwargs)
+        calls = []
+
+        def probe(name):
+            def run():
+                calls.append(name)
+                return name != 'x'
+            return run
+
+        dag.a.depends_on('b', 'c')
+        dag.b.depends_on('d')
+        dag.c.depends_on('d')
+        for name in 'abc':
+            dag[name].payload = f'payload-{name}'
+        dag.d.payload = probe('d')
+        dag.e.payload = probe('e')
+        return dag, probe, calls
+
+    def test_is_resolved__probe_called_once(self):
+        dag, _, calls = self.create_probed_dag()
+        self.assertTrue(dag.a.is_resolved())
+        self.assertEqual(['d'], calls)
+        self.assertTrue(dag.a.is_resolved())
+        self.assertEqual(['d', 'd'], calls)
+        self.assertEqual(['a', 'b', 'c', 'd', 'e'], names_list(dag.resolved_vertices()))
+        self.assertEqual(['d', 'd', 'd', 'e'], calls)
+
+    def test_is_resolved__probe_short_circuit(self):
+        dag, probe, calls = self.create_probed_dag()
+        dag.f.depends_on('x', 'a')
+        dag.f.payload = 'payload-f'
+        dag.x.payload = probe('x')
+        self.assertFalse(dag.f.is_resolved())
+        self.assertEqual(['x'], calls)
+
+    def test_is_resolved__probe_ttl(self):
+        dag, probe, calls = self.create_probed_dag(probe_ttl=60)
+        self.assertTrue(dag.a.is_resolved())
+        self.assertTrue(dag.d.has_payload())
+        self.assertTrue(dag.b.is_resolved())
+        self.assertEqual(['d'], calls)
+        dag.clear_probe_cache()
+        self.assertTrue(dag.a.is_resolved())
+        self.assertEqual(['d', 'd'], calls)
+        dag.d.payload = probe('x')
+        self.assertFalse(dag.a.is_resolved())
+        self.assertEqual(['d', 'd', 'x'], calls)
+
+    def test_is_resolved__probe_ttl_expired(self):
+        dag, _, calls = self.create_probed_dag(probe_ttl=0)
+        dag.a.is_resolved()
+        dag.a.is_resolved()
+        self.assertEqual(['d', 'd'], calls)
+
+    def test_is_resolved__probe_batch(self):
+        batches = []
+
+        def probe_batch(vertices):
+            batches.append(names_list(vertices))
+            return [vertex.name != 'f' for vertex in vertices]
+
+        dag, probe, calls = self.create_probed_dag(probe_batch=probe_batch)
+        dag.b.depends_on('e', 'f')
+        dag.f.payload = probe('f')
+        self.assertFalse(dag.a.is_resolved())
+        self.assertEqual([['d', 'e', 'f']], [sorted(batches[0])])
+        self.assertTrue(dag.e.has_payload())
+        self.assertEqual([], calls)
+        self.assertEqual(['c', 'd', 'e'], names_list(dag.resolved_vertices()))
+        self.assertEqual(3, len(batches))
+        self.assertIs(probe_batch, dag.clone()._probe_batch)
+
+    def test_is_resolved__cyclic(self):
+        dag = DepDag()
+        dag.a.depends_on('b')
+        dag.b.depends_on('a')
+        dag.a.payload = 'payload-a'
+        dag.b.payload = 'payload-b'
+        # undefined on a cycle, as it depends on the order of the changes
+        self.assertIn(dag.a.is_resolved(), (True, False))
+        dag.b.remove_dependency('a')
+        self.assertTrue(dag.a.is_resolved())
+        self.assertTrue(dag.b.is_resolved())
+        dag.b.payload = None
+        self.assertFalse(dag.a.is_resolved())
+
     def test_vertex_name_is_tuple(self):
         # exercising any hashable to be used as a vertex name (PR #2)
         dag = DepDag()
@@ -104,8 +257,69 @@ class TestDag(unittest.TestCase):
         dag = DepDag(fail_on_cycle=True)
         dag.a.depends_on('b')
         dag.b.depends_on('c')
-        with self.assertRaisesRegex(CycleDetected, r"on adding vertices \('a',\)"):
+        with self.assertRaisesRegex(CycleDetected, r"on adding vertices \('a',\)") as ctx:
             dag.c.depends_on('a')
+        self.assertEqual(['c', 'a', 'b'], names_list(ctx.exception.cycle))
+
+    def test_check_for_cycles__dag_unchanged_on_failure(self):
+        dag = DepDag(fail_on_cycle=True)
+        dag.a.depends_on('b')
+        dag.b.depends_on('c')
+        with self.assertRaises(CycleDetected):
+            dag.c.depends_on('d', 'a')
+        self.assertEqual([], names_list(dag.c.direct_supporters()))
+        self.assertNotIn('d', dag)
+        self.assertFalse(dag.is_cyclic())
+
+    def test_check_for_cycles__self_dependency(self):
+        dag = DepDag(fail_on_cycle=True)
+        with self.assertRaises(CycleDetected):
+            dag.a.depends_on('a')
+
+    def test_check_for_cycles__long_chain(self):
+        dag = DepDag(fail_on_cycle=True)
+        for idx in range(5000):
+            dag[idx].depends_on(idx + 1)
+        with self.assertRaises(CycleDetected):
+            dag[5000].depends_on(0)
+
+    def test_check_for_cycles__long_chain_supporters_first(self):
+        dag = DepDag(fail_on_cycle=True)
+        for idx in range(20000):
+            dag[idx + 1].depends_on(idx)
+        with self.assertRaises(CycleDetected) as ctx:
+            dag[0].depends_on(20000)
+        self.assertEqual(20001, len(ctx.exception.cycle))
+
+    def test_check_for_cycles__order_kept(self):
+        rand = random.Random(7)
+        dag = DepDag(fail_on_cycle=True)
+        for step in range(2000):
+            dependant, supporter = rand.randrange(300), rand.randrange(300)
+            try:
+                dag[dependant].depends_on(supporter)
+            except CycleDetected:
+                self.assertTrue(dag.is_reachable(dag[supporter], dag[dependant]))
+            if step % 50 == 0:
+                dag.add_edges([(rand.randrange(300), 300 + rand.randrange(300))])
+        self.assertFalse(dag.is_cyclic())
+        for vertex in dag.all_vertices():
+            for supporter in vertex.direct_supporters():
+                self.assertLess(supporter._order, vertex._order)
+        dag_clone = dag.clone()
+        self.assertTrue(all(supporter._order < vertex._order
+                            for vertex in dag_clone.all_vertices()
+                            for supporter in vertex.direct_supporters()))
+
+    def test_is_reachable(self):
+        dag = DepDag()
+        dag.a.depends_on('b')
+        dag.b.depends_on('c')
+        dag.d.depends_on('c')
+        self.assertTrue(dag.is_reachable(dag.a, dag.c))
+        self.assertTrue(dag.is_reachable(dag.a, dag.a))
+        self.assertFalse(dag.is_reachable(dag.c, dag.a))
+        self.assertFalse(dag.is_reachable(dag.a, dag.d))
 
     def test__getitem__(self):
         dag = DepDag()
@@ -148,12 +362,330 @@ class TestDag(unittest.TestCase):
         dag.b.depends_on('c')
         self.assertEqual(['b', 'c'], names_list(dag.a.all_supporters()))
 
+    def test_all_supporters__order(self):
+        dag = DepDag()
+        dag.a.depends_on('b', 'c')
+        dag.b.depends_on('d')
+        dag.c.depends_on('e')
+        dag.d.depends_on('f')
+        self.assertEqual(['b', 'c', 'd', 'f', 'e'], names_list(dag.a.all_supporters()))
+
+    def test_all_supporters__unique(self):
+        dag = DepDag()
+        dag.a.depends_on('b', 'c')
+        dag.b.depends_on('d', 'e')
+        dag.c.depends_on('d')
+        dag.d.depends_on('e')
+        self.assertEqual(['b', 'c', 'd', 'e', 'e', 'd', 'e'],
+                         names_list(dag.a.all_supporters()))
+        self.assertEqual(['b', 'c', 'd', 'e'],
+                         names_list(dag.a.all_supporters(unique=True)))
+
+    def test_all_supporters__unique__diamond_lattice(self):
+        dag = DepDag()
+        for level in range(100):
+            for idx in range(2):
+                dag[level, idx].depends_on((level + 1, 0), (level + 1, 1))
+        self.assertEqual(200, len(list(dag[0, 0].all_supporters(unique=True))))
+
+    def test_all_supporters__long_chain(self):
+        dag = DepDag()
+        for idx in range(10000):
+            dag[idx].depends_on(idx + 1)
+        self.assertEqual(10000, len(list(dag[0].all_supporters())))
+        self.assertEqual(10000, len(list(dag[0].all_supporters(unique=True))))
+
+    def test_all_supporters__unique__cyclic(self):
+        dag = DepDag()
+        dag.a.depends_on('b')
+        dag.b.depends_on('a')
+        self.assertEqual(['b', 'a'], names_list(dag.a.all_supporters(unique=True)))
+
+    def test_closure__cached(self):
+        dag = DepDag(cache_closures=True)
+        dag.a.depends_on('b')
+        self.assertEqual(['b'], names_list(dag.closure(dag.a)))
+        self.assertEqual(['b'], names_list(dag.a.all_supporters(unique=True)))
+        dag.b.depends_on('c')
+        self.assertEqual(['b', 'c'], names_list(dag.a.all_supporters(unique=True)))
+        dag.a.depends_on('c')
+        self.assertEqual(['b', 'c'], names_list(dag.closure(dag.a)))
+        self.assertEqual(['c'], names_list(dag.closure(dag.b)))
+        dag.c.depends_on('d')
+        self.assertEqual(['b', 'c', 'd'], names_list(dag.closure(dag.a)))
+        self.assertEqual(['c', 'd'], names_list(dag.closure(dag.b)))
+
+    def test_add_edges(self):
+        dag = DepDag()
+        dag.a.depends_on('b')
+        dag.add_edges((name, name + '1') for name in ['a', 'b', 'a'])
+        self.assertEqual(['a', 'b', 'a1', 'b1'], names_list(dag.all_vertices()))
+        self.assertEqual(['b', 'a1'], names_list(dag.a.direct_supporters()))
+        self.assertEqual(['b1'], names_list(dag.b.direct_supporters()))
+        self.assertEqual(['a'], names_list(dag.b.direct_dependants()))
+
+    def test_add_edges__updates_state(self):
+        dag = DepDag(cache_closures=True)
+        dag.new_vertex('a', 'payload-a')
+        self.assertTrue(dag.a.is_resolved())
+        self.assertEqual([], names_list(dag.a.all_supporters(unique=True)))
+        self.assertEqual([['a']], [names_list(level) for level in dag.levels()])
+        dag.add_edges([('a', 'b')])
+        self.assertFalse(dag.a.is_resolved())
+        self.assertEqual(['b'], names_list(dag.a.all_supporters(unique=True)))
+        self.assertEqual([['b'], ['a']], [names_list(level) for level in dag.levels()])
+
+    def test_add_edges__cyclic(self):
+        dag = DepDag(fail_on_cycle=True)
+        dag.a.depends_on('b')
+        with self.assertRaisesRegex(CycleDetected, "on adding edges") as ctx:
+            dag.add_edges([('b', 'c'), ('c', 'd'), ('d', 'a')])
+        self.assertEqual(['b', 'c', 'd', 'a'], names_list(ctx.exception.cycle))
+        self.assertEqual([], names_list(dag.b.direct_supporters()))
+        self.assertEqual([], names_list(dag.c.direct_supporters()))
+        self.assertFalse(dag.is_cyclic())
+
+    def test_from_edges(self):
+        dag = DepDag.from_edges([('a', 'b'), ('b', 'c')], fail_on_cycle=True)
+        self.assertTrue(dag.fail_on_cycle)
+        self.assertEqual(['b', 'c'], names_list(dag.a.all_supporters()))
+        with self.assertRaises(CycleDetected):
+            DepDag.from_edges([('a', 'b'), ('b', 'a')], fail_on_cycle=True)
+
+    def test_remove_dependency(self):
+        dag = DepDag(cache_closures=True)
+        dag.a.depends_on('b', 'c')
+        dag.b.depends_on('c')
+        dag.c.payload = 'payload-c'
+        dag.a.payload = 'payload-a'
+        self.assertEqual(['b', 'c'], names_list(dag.a.all_supporters(unique=True)))
+        self.assertEqual([['c'], ['b'], ['a']], [names_list(level) for level in dag.levels()])
+        self.assertFalse(dag.a.is_resolved())
+
+        dag.a.remove_dependency('b', 'x')
+        self.assertEqual(['c'], names_list(dag.a.direct_supporters()))
+        self.assertEqual(['a', 'b'], names_list(dag.c.direct_dependants()))
+        self.assertEqual([], names_list(dag.b.direct_dependants()))
+        self.assertEqual(['c'], names_list(dag.a.all_supporters(unique=True)))
+        self.assertEqual([['c'], ['a', 'b']], [names_list(level) for level in dag.levels()])
+        self.assertTrue(dag.a.is_resolved())
+        self.assertIn('b', dag)
+
+    def test_remove_dependency__breaks_cycle(self):
+        dag = DepDag()
+        dag.a.depends_on('b')
+        dag.b.depends_on('a')
+        dag.a.payload = 'payload-a'
+        dag.b.payload = 'payload-b'
+        self.assertFalse(dag.a.is_resolved())
+        dag.b.remove_dependency('a')
+        self.assertFalse(dag.is_cyclic())
+        self.assertTrue(dag.a.is_resolved())
+        self.assertTrue(dag.b.is_resolved())
+
+    def test_remove_edges(self):
+        dag = DepDag()
+        dag.a.depends_on('b', 'c')
+        dag.b.depends_on('c')
+        dag.remove_edges([('a', 'b'), ('b', 'c'), ('b', 'x'), ('x', 'y')])
+        self.assertEqual(['c'], names_list(dag.a.direct_supporters()))
+        self.assertEqual([], names_list(dag.b.direct_supporters()))
+        self.assertEqual(['a'], names_list(dag.c.direct_dependants()))
+        self.assertNotIn('x', dag)
+
+    def test_remove_vertex(self):
+        dag = DepDag(cache_closures=True)
+        dag.a.depends_on('b')
+        dag.b.depends_on('c')
+        dag.a.payload = 'payload-a'
+        dag.c.payload = 'payload-c'
+        self.assertEqual(['b', 'c'], names_list(dag.a.all_supporters(unique=True)))
+        dag.remove_vertex('b')
+        self.assertEqual(['a', 'c'], names_list(dag.all_vertices()))
+        self.assertEqual([], names_list(dag.a.direct_supporters()))
+        self.assertEqual([], names_list(dag.c.direct_dependants()))
+        self.assertEqual([], names_list(dag.a.all_supporters(unique=True)))
+        self.assertTrue(dag.a.is_resolved())
+        with self.assertRaises(KeyError):
+            dag.remove_vertex('b')
+
+    def test_remove_vertices(self):
+        dag = DepDag()
+        dag.a.depends_on('b', 'c', 'd')
+        dag.remove_vertices(['b', 'd'])
+        self.assertEqual(['a', 'c'], names_list(dag.all_vertices()))
+        self.assertEqual(['c'], names_list(dag.a.direct_supporters()))
+
     def test_all(self):
         dag = DepDag()
         dag.a.depends_on('b')
         dag.b.depends_on('c')
         self.assertEqual([dag.a, dag.b, dag.c], list(dag.all_vertices()))
 
+    def test_levels(self):
+        dag = DepDag()
+        dag.a.depends_on('b', 'c')
+        dag.b.depends_on('d')
+        dag.c.depends_on('d')
+        dag.e.depends_on('c')
+        dag.new_vertex('f')
+        self.assertEqual([['d', 'f'], ['b', 'c'], ['a', 'e']],
+                         [names_list(level) for level in dag.levels()])
+
+    def test_levels__empty_dag(self):
+        self.assertEqual([], DepDag().levels())
+
+    def test_levels__cache_dropped_on_change(self):
+        dag = DepDag()
+        dag.a.depends_on('b')
+        self.assertEqual([['b'], ['a']], [names_list(level) for level in dag.levels()])
+        dag.b.depends_on('c')
+        self.assertEqual([['c'], ['b'], ['a']], [names_list(level) for level in dag.levels()])
+        dag.new_vertex('d')
+        self.assertEqual([['c', 'd'], ['b'], ['a']],
+                         [names_list(level) for level in dag.levels()])
+
+    def test_levels__cyclic(self):
+        dag = DepDag()
+        dag.a.depends_on('b')
+        dag.b.depends_on('c')
+        dag.c.depends_on('b')
+        with self.assertRaisesRegex(CycleDetected, "'b' -> 'c' -> 'b'"):
+            dag.levels()
+
+    def test_topological_order(self):
+        dag = DepDag()
+        dag.a.depends_on('b', 'c')
+        dag.b.depends_on('c')
+        dag.d.depends_on('a')
+        self.assertEqual(['c', 'b', 'a', 'd'], names_list(dag.topological_order()))
+
+    def test_topological_order__long_chain(self):
+        dag = DepDag()
+        for idx in range(10000):
+            dag[idx].depends_on(idx + 1)
+        self.assertEqual(list(range(10000, -1, -1)), names_list(dag.topological_order()))
+
+    def test_invalidate(self):
+        dag = DepDag()
+        dag.a.depends_on('b', 'c')
+        dag.b.depends_on('d')
+        dag.c.depends_on('e')
+        dag.f.depends_on('a')
+        self.assertEqual(['b', 'a', 'f'], names_list(dag.invalidate(['b'])))
+        self.assertEqual(['e', 'd', 'c', 'b', 'a', 'f'],
+                         names_list(dag.invalidate(['e', 'd'])))
+        self.assertEqual(['f'], names_list(dag.invalidate(['f'])))
+        with self.assertRaises(KeyError):
+            dag.invalidate(['x'])
+
+    def test_invalidate__cyclic(self):
+        dag = DepDag()
+        dag.a.depends_on('b')
+        dag.b.depends_on('c')
+        dag.c.depends_on('b')
+        self.assertEqual(['a'], names_list(dag.invalidate(['a'])))
+        with self.assertRaises(CycleDetected) as ctx:
+            dag.invalidate(['c'])
+        self.assertEqual(['c', 'b'], names_list(ctx.exception.cycle))
+
+    def create_weighted_dag(self):
+        dag = DepDag()
+        dag.a.depends_on('b', 'c')
+        dag.b.depends_on('d')
+        dag.c.depends_on('d')
+        dag.e.depends_on('c')
+        weights = {'a': 1, 'b': 5, 'c': 2, 'd': 1, 'e': 1}
+        return dag, lambda vertex: weights[vertex.name]
+
+    def test_critical_path(self):
+        dag, weight = self.create_weighted_dag()
+        result = dag.critical_path(weight)
+        self.assertIsInstance(result, CriticalPath)
+        self.assertEqual(7, result.length)
+        self.assertEqual(['d', 'b', 'a'], names_list(result.path))
+        self.assertEqual({'d': 0, 'b': 1, 'c': 1, 'e': 3, 'a': 6}, result.earliest_start)
+        self.assertEqual({'d': 0, 'b': 0, 'c': 3, 'e': 3, 'a': 0}, result.slack)
+
+    def test_critical_path__unit_weight(self):
+        dag, _ = self.create_weighted_dag()
+        result = dag.critical_path()
+        self.assertEqual(3, result.length)
+        self.assertEqual(['d', 'b', 'a'], names_list(result.path))
+        self.assertEqual(0, result.slack['e'])
+
+    def test_critical_path__empty_dag(self):
+        self.assertEqual((0, [], {}, {}), DepDag().critical_path())
+
+    def test_critical_path__cyclic(self):
+        dag = DepDag()
+        dag.a.depends_on('b')
+        dag.b.depends_on('a')
+        with self.assertRaises(CycleDetected):
+            dag.critical_path()
+
+    def test_simulate(self):
+        dag, weight = self.create_weighted_dag()
+        self.assertEqual(10, dag.simulate(1, weight))
+        self.assertEqual(7, dag.simulate(2, weight))
+        self.assertEqual(7, dag.simulate(100, weight))
+        self.assertEqual(5, dag.simulate(1))
+        self.assertEqual(3, dag.simulate(2))
+        self.assertEqual(0, DepDag().simulate(4))
+        with self.assertRaises(ValueError):
+            dag.simulate(0)
+
+    def test_redundant_edges(self):
+        dag = DepDag()
+        dag.a.depends_on('b', 'c', 'd')
+        dag.b.depends_on('c', 'd')
+        dag.c.depends_on('d')
+        dag.e.depends_on('a', 'd')
+        self.assertEqual([('b', 'd'), ('a', 'c'), ('a', 'd'), ('e', 'd')],
+                         dag.redundant_edges())
+        self.assertEqual([], DepDag().redundant_edges())
+
+    def test_redundant_edges__cyclic(self):
+        dag = DepDag()
+        dag.a.depends_on('b')
+        dag.b.depends_on('a')
+        with self.assertRaises(CycleDetected):
+            dag.redundant_edges()
+            dag.critical_path()
+            dag.simulate(2)
+
+    def test_transitive_reduction(self):
+        dag = DepDag()
+        dag.a.depends_on('b', 'c', 'd')
+        dag.b.depends_on('c')
+        dag.c.depends_on('d')
+        dag.d.payload = 'payload-d'
+        reduced = dag.transitive_reduction()
+        self.assertIsNot(dag, reduced)
+        self.assertEqual(['b', 'c', 'd'], names_list(dag.a.direct_supporters()))
+        self.assertEqual(['b'], names_list(reduced.a.direct_supporters()))
+        self.assertEqual('payload-d', reduced.d.payload)
+        self.assertEqual(sorted(names_list(dag.a.all_supporters(unique=True))),
+                         sorted(names_list(reduced.a.all_supporters(unique=True))))
+
+    def test_transitive_reduction__in_place(self):
+        dag = DepDag()
+        for idx in range(1, 20):
+            dag[idx].depends_on(*range(idx))
+        self.assertIs(dag, dag.transitive_reduction(in_place=True))
+        self.assertEqual([], dag.redundant_edges())
+        for idx in range(1, 20):
+            self.assertEqual([idx - 1], names_list(dag[idx].direct_supporters()))
+
+    def test_resolved_vertices(self):
+        dag = DepDag()
+        dag.a.depends_on('b', 'c')
+        dag.b.depends_on('c')
+        dag.b.payload = 'payload-b'
+        dag.c.payload = 'payload-c'
+        self.assertEqual(['b', 'c'], names_list(dag.resolved_vertices()))
+        self.assertEqual(['a'], names_list(dag.unresolved_vertices()))
+
     def test_is_cyclic__negative__empty_dag(self):
         dag = DepDag()
         self.assertFalse(dag.is_cyclic())
@@ -191,6 +723,41 @@ class TestDag(unittest.TestCase):
         dag.e.depends_on('f')
         self.assertFalse(dag.is_cyclic())
 
+    def test_is_cyclic__long_chain(self):
+        dag = DepDag()
+        for idx in range(10000):
+            dag[idx].depends_on(idx + 1)
+        self.assertFalse(dag.is_cyclic())
+        dag[10000].depends_on(0)
+        self.assertTrue(dag.is_cyclic())
+
+    def test_is_cyclic__diamond_lattice(self):
+        dag = DepDag()
+        for level in range(100):
+            for idx in range(2):
+                dag[level, idx].depends_on((level + 1, 0), (level + 1, 1))
+        self.assertFalse(dag.is_cyclic())
+
+    def test_find_cycle(self):
+        dag = DepDag()
+        dag.a.depends_on('b')
+        dag.b.depends_on('c')
+        self.assertEqual([], dag.find_cycle())
+        dag.c.depends_on('d', 'b')
+        self.assertEqual(['b', 'c'], names_list(dag.find_cycle()))
+
+    def test_find_cycle__one_vertex(self):
+        dag = DepDag()
+        dag.a.depends_on('a')
+        self.assertEqual(['a'], names_list(dag.find_cycle()))
+
+    def test_supporting_path(self):
+        dag = DepDag()
+        dag.a.depends_on('b', 'c')
+        dag.c.depends_on('d')
+        self.assertEqual(['a', 'c', 'd'], names_list(dag.supporting_path(dag.a, dag.d)))
+        self.assertEqual([], dag.supporting_path(dag.d, dag.a))
+
     def test_clone__case_simple(self):
         dag = DepDag()
         dag.new_vertex('a', 'payload-a')
@@ -257,6 +824,27 @@ class TestDag(unittest.TestCase):
         self.assertEqual('payload-d', new_dag.d.payload)
         self.assertTrue(new_dag.is_cyclic())
 
+    def test_clone__settings(self):
+        dag = DepDag(fail_on_cycle=True, cache_closures=True)
+        dag.a.depends_on('b')
+        new_dag = dag.clone()
+        self.assertTrue(new_dag.fail_on_cycle)
+        self.assertEqual(['b'], names_list(new_dag.a.all_supporters(unique=True)))
+        with self.assertRaises(CycleDetected):
+            new_dag.b.depends_on('a')
+
+    def test_clone__resolution_state(self):
+        dag = DepDag()
+        dag.new_vertex('a', 'payload-a')
+        dag.new_vertex('b', 'payload-b')
+        dag.a.depends_on('b')
+        self.assertTrue(dag.clone().a.is_resolved())
+        new_dag = dag.clone(lambda p: None if p == 'payload-b' else p)
+        self.assertFalse(new_dag.a.is_resolved())
+        self.assertEqual(['a'], names_list(new_dag.b.direct_dependants()))
+        new_dag.b.payload = 'new-payload-b'
+        self.assertTrue(new_dag.a.is_resolved())
+
     def test_ensure_not_cyclic__passes(self):
         dag = DepDag()
         dag.a.depends_on('b')
@@ -267,8 +855,726 @@ class TestDag(unittest.TestCase):
         dag = DepDag()
         dag.a.depends_on('b')
         dag.b.depends_on('a')
-        with self.assertRaisesRegex(CycleDetected, 'graph is cyclic'):
+        with self.assertRaisesRegex(CycleDetected, 'graph is cyclic') as ctx:
             dag.ensure_not_cyclic()
+        self.assertEqual(['a', 'b'], names_list(ctx.exception.cycle))
+        self.assertIn("'a' -> 'b' -> 'a'", str(ctx.exception))
+
+
+class TestRebuild(unittest.TestCase):
+
+    def create_dag(self):
+        dag = diamond_dag()
+        dag.e.depends_on('c')
+        return dag
+
+    def test_rebuild(self):
+        dag = self.create_dag()
+        rebuild = dag.rebuild(['d'])
+        self.assertIsInstance(rebuild, Rebuild)
+        self.assertEqual(['d'], names_list(rebuild.ready()))
+        self.assertEqual([], rebuild.ready())
+        rebuild.done(dag.d)
+        self.assertEqual(['b', 'c'], names_list(rebuild.ready()))
+        rebuild.done(dag.c)
+        self.assertEqual(['e'], names_list(rebuild.ready()))
+        rebuild.done(dag.b)
+        rebuild.done(dag.e)
+        self.assertEqual(['a'], names_list(rebuild.ready()))
+        self.assertFalse(rebuild.is_finished())
+        rebuild.done(dag.a)
+        self.assertTrue(rebuild.is_finished())
+        self.assertEqual([], rebuild.skipped)
+
+    def test_rebuild__early_cutoff(self):
+        dag = self.create_dag()
+        rebuild = dag.rebuild(['d'])
+        run = []
+        for vertex in rebuild:
+            run.append(vertex.name)
+            rebuild.done(vertex, changed=vertex.name in ('d', 'b'))
+        self.assertEqual(['d', 'b', 'c', 'a'], run)
+        self.assertEqual(['e'], names_list(rebuild.skipped))
+        self.assertTrue(rebuild.is_finished())
+
+    def test_rebuild__unchanged(self):
+        dag = self.create_dag()
+        rebuild = dag.rebuild(['d'])
+        self.assertEqual(['d'], [vertex.name for vertex in rebuild])
+        rebuild.done(dag.d, changed=False)
+        self.assertEqual([], list(rebuild))
+        self.assertEqual(['b', 'c', 'e', 'a'], names_list(rebuild.skipped))
+        self.assertTrue(rebuild.is_finished())
+
+    def test_rebuild__run(self):
+        dag = self.create_dag()
+        for vertex in dag.all_vertices():
+            vertex.payload = 'old'
+        run = []
+
+        def compute(name, supporters):
+            run.append(name)
+            return 'new' if name in ('d', 'c') else 'old'
+
+        dag.rebuild(['d']).run(compute)
+        self.assertEqual(['d', 'b', 'c', 'a', 'e'], run)
+        run.clear()
+        dag.rebuild(['d']).run(compute)
+        self.assertEqual(['d'], run)
+        self.assertEqual('new', dag.d.payload)
+
+
+class TestStats(unittest.TestCase):
+
+    def test_instrument(self):
+        dag = diamond_dag()
+        self.assertIsNone(dag.stats)
+        with dag.instrument() as stats:
+            self.assertIs(stats, dag.stats)
+            self.assertEqual(['b', 'c', 'd', 'd'], names_list(dag.a.all_supporters()))
+        self.assertIsNone(dag.stats)
+        self.assertEqual(5, stats.vertices_visited)
+        self.assertEqual(4, stats.edges_traversed)
+        list(dag.a.all_supporters())
+        self.assertEqual(5, stats.vertices_visited)
+
+    def test_instrument__cycle_checks_and_timings(self):
+        dag = diamond_dag(fail_on_cycle=True)
+        with dag.instrument() as stats:
+            dag.c.depends_on('b', 'e')  # only 'b' is ordered after 'c'
+            dag.add_edges([('f', 'g')])  # new vertices are ordered as they come
+            dag.is_cyclic()
+        self.assertEqual(2, stats.cycle_checks)
+        self.assertEqual({'depends_on': 1, 'add_edges': 1, 'find_cycle': 1}, stats.calls)
+        self.assertEqual(set(stats.calls), set(stats.timings))
+        self.assertTrue(all(seconds >= 0 for seconds in stats.timings.values()))
+
+    def test_instrument__add_edges_bounded(self):
+        dag = DepDag(fail_on_cycle=True)
+        dag.add_edges((str(number), str(number + 1)) for number in range(1000))
+        with dag.instrument() as stats:
+            for number in range(100):
+                dag.add_edges([(str(number), f'new{number}')])
+            dag.add_edges([('new0', '999'), ('new1', '998')])
+        self.assertEqual(2, stats.cycle_checks)
+        self.assertLess(stats.vertices_visited, 10)
+        with self.assertRaises(CycleDetected):
+            dag.add_edges([('999', '1000'), ('1000', '500')])
+        self.assertFalse(dag.is_cyclic())
+        self.assertTrue(dag.is_reachable(dag['new0'], dag['1000']))
+
+    def test_instrument__probes(self):
+        dag = diamond_dag()
+        for name in 'abc':
+            dag[name].payload = f'payload-{name}'
+        dag.d.payload = lambda: True
+        with dag.instrument() as stats:
+            dag.a.is_resolved()
+            dag.b.is_resolved()
+        self.assertEqual(2, stats.probes_called)
+        self.assertEqual(2, stats.calls['probes'])
+        self.assertEqual(0, stats.probe_batches)
+
+    def test_instrument__hook_and_reset(self):
+        dag = diamond_dag()
+        recorded = []
+        stats = Stats(hook=lambda operation, seconds: recorded.append(operation))
+        with dag.instrument(stats):
+            dag.levels()
+            dag.clone()
+        self.assertEqual(['levels', 'clone'], recorded)
+        self.assertIn('vertices_visited=4', repr(stats))
+        stats.reset()
+        self.assertEqual(0, stats.vertices_visited)
+        self.assertEqual({}, stats.calls)
+
+
+class TestChanges(unittest.TestCase):
+
+    def test_version(self):
+        dag = DepDag()
+        self.assertEqual(0, dag.version)
+        dag.a.depends_on('b', 'c')
+        self.assertEqual(5, dag.version)
+        dag.a.depends_on('b')
+        self.assertEqual(5, dag.version)
+        dag.a.payload = 'payload-a'
+        self.assertEqual(6, dag.version)
+
+    def test_subscribe(self):
+        dag = DepDag()
+        changes = []
+        dag.subscribe(changes.append)
+        dag.a.depends_on('b')
+        dag.b.payload = 'payload-b'
+        dag.b.payload = None
+        dag.new_vertex('c', 'payload-c')
+        self.assertEqual([
+            Change(1, VERTEX_CREATED, 'a'),
+            Change(2, VERTEX_CREATED, 'b'),
+            Change(3, EDGE_ADDED, 'a', 'b'),
+            Change(4, PAYLOAD_SET, 'b'),
+            Change(5, PAYLOAD_CLEARED, 'b'),
+            Change(6, VERTEX_CREATED, 'c'),
+        ], changes)
+        dag.unsubscribe(changes.append)
+        dag.c.depends_on('a')
+        self.assertEqual(6, len(changes))
+
+    def test_subscribe__add_edges(self):
+        dag = DepDag()
+        dag.new_vertex('a')
+        dag.new_vertex('b')
+        changes = []
+        dag.subscribe(changes.append)
+        dag.add_edges([('a', 'b'), ('b', 'c')])
+        self.assertEqual([(VERTEX_CREATED, 'c', None), (EDGE_ADDED, 'a', 'b'),
+                          (EDGE_ADDED, 'b', 'c')],
+                         [(change.kind, change.name, change.supporter) for change in changes])
+
+    def test_subscribe__removal(self):
+        dag = DepDag()
+        dag.a.depends_on('b', 'c')
+        changes = []
+        dag.subscribe(changes.append)
+        dag.a.remove_dependency('b')
+        dag.remove_vertex('c')
+        self.assertEqual([(EDGE_REMOVED, 'a', 'b'), (EDGE_REMOVED, 'a', 'c'),
+                          (VERTEX_REMOVED, 'c', None)],
+                         [(change.kind, change.name, change.supporter) for change in changes])
+
+    def test_subscribe__sees_changed_dag(self):
+        dag = DepDag()
+        for name in 'abc':
+            dag.new_vertex(name)
+        dag.levels()
+        seen = []
+        dag.subscribe(lambda change: seen.append(names_list(dag.topological_order())))
+        dag.a.depends_on('b')
+        self.assertEqual([['b', 'c', 'a']], seen)
+        dag.a.remove_dependency('b')
+        self.assertEqual(['a', 'b', 'c'], seen[-1])
+
+    def test_subscribe__raising_keeps_order(self):
+        dag = DepDag(fail_on_cycle=True)
+        dag.new_vertex('x')
+        dag.new_vertex('y')  # ordered after 'x', reordered by the new edge
+
+        def fail(change):
+            if change.kind == EDGE_ADDED:
+                raise RuntimeError(change)
+        dag.subscribe(fail)
+        with self.assertRaises(RuntimeError):
+            dag.add_edges([('x', 'y')])
+        dag.unsubscribe(fail)
+        with self.assertRaises(CycleDetected):
+            dag.y.depends_on('x')
+        self.assertFalse(dag.is_cyclic())
+
+    def test_changes_since(self):
+        dag = DepDag(journal_size=3)
+        dag.a.depends_on('b')
+        version = dag.version
+        self.assertEqual([], dag.changes_since(version))
+        dag.a.payload = 'payload-a'
+        self.assertEqual([Change(4, PAYLOAD_SET, 'a')], dag.changes_since(version))
+        self.assertEqual(3, len(dag.changes_since(1)))
+        with self.assertRaisesRegex(ValueError, 'no longer journaled'):
+            dag.changes_since(0)
+
+    def test_changes_since__no_journal(self):
+        with self.assertRaisesRegex(ValueError, 'no change journal'):
+            DepDag().changes_since(0)
+
+
+class TestThreadSafe(unittest.TestCase):
+
+    def test_thread_safe(self):
+        self.assertFalse(DepDag().thread_safe)
+        dag = DepDag(thread_safe=True)
+        self.assertTrue(dag.thread_safe)
+        self.assertTrue(dag.clone().thread_safe)
+        self.assertTrue(DepDag.from_edges([('a', 'b')], thread_safe=True).thread_safe)
+
+    @staticmethod
+    def guarded(fn, errors, *args):
+        def run():
+            try:
+                fn(*args)
+            except Exception as exc:
+                errors.append(exc)
+        return threading.Thread(target=run)
+
+    @staticmethod
+    def write(dag, idx):
+        for i in range(200):
+            name = f'w{idx}-{i}'
+            dag.add_edges([(name, 'hub'), (name, f'w{idx}-{i // 2}')] if i else [(name, 'hub')])
+            dag[name].payload = name
+            dag.hub.depends_on(f'leaf{idx}-{i}')
+
+    @staticmethod
+    def read(dag, done):
+        while not done.is_set():
+            for vertex in dag.all_vertices():
+                vertex.is_resolved()
+                list(vertex.direct_dependants())
+            list(dag.hub.all_supporters(unique=True))
+            dag.levels()
+            dag.changes_since(0)
+            dag.redundant_edges()
+            dag.critical_path()
+            dag.simulate(2)
+
+    def test_concurrent_readers_and_writers(self):
+        dag = DepDag(thread_safe=True, cache_closures=True, journal_size=10000)
+        dag.hub.payload = 'payload-hub'
+        errors, done = [], threading.Event()
+        writers = [self.guarded(self.write, errors, dag, idx) for idx in range(4)]
+        readers = [self.guarded(self.read, errors, dag, done) for _ in range(4)]
+        for thread in readers + writers:
+            thread.start()
+        for thread in writers:
+            thread.join()
+        done.set()
+        for thread in readers:
+            thread.join()
+
+        self.assertEqual([], errors)
+        self.assertEqual(1 + 4 * 200 * 2, len(dag))
+        changes = dag.changes_since(0)
+        self.assertEqual(list(range(1, dag.version + 1)), [change.version for change in changes])
+        self.assertEqual(4 * 200, len(list(dag.hub.all_supporters(unique=True))))
+        self.assertFalse(dag.w0_0.is_resolved())
+        for i in range(4):
+            for j in range(200):
+                dag[f'leaf{i}-{j}'].payload = 'payload-leaf'
+        self.assertTrue(dag['w3-199'].is_resolved())
+        self.assertFalse(dag.is_cyclic())
+        self.assertEqual([names_list(level) for level in dag.levels()],
+                         [names_list(level) for level in dag.clone().levels()])
+
+
+class TestDagView(unittest.TestCase):
+
+    def create_dag(self):
+        dag = diamond_dag()
+        dag.e.depends_on('c', 'f')
+        return dag
+
+    def test_subgraph__supporters(self):
+        dag = self.create_dag()
+        view = dag.subgraph(['c', 'b'])
+        self.assertIsInstance(view, DagView)
+        self.assertEqual(['c', 'd', 'b'], names_list(view.all_vertices()))
+        self.assertEqual(3, len(view))
+        self.assertIn('d', view)
+        self.assertNotIn('a', view)
+        self.assertNotIn('x', view)
+        self.assertIs(dag.d, view['d'])
+        with self.assertRaises(KeyError):
+            view['a']
+        self.assertEqual(6, len(dag))
+
+    def test_subgraph__dependants(self):
+        view = self.create_dag().subgraph(['c'], direction='dependants')
+        self.assertEqual(['c', 'a', 'e'], [name for name, _ in view])
+
+    def test_subgraph__invalid(self):
+        dag = self.create_dag()
+        with self.assertRaises(KeyError):
+            dag.subgraph(['x'])
+        with self.assertRaises(ValueError):
+            dag.subgraph(['a'], direction='sideways')
+
+    def test_is_cyclic(self):
+        dag = self.create_dag()
+        dag.d.depends_on('e')
+        self.assertTrue(dag.is_cyclic())
+        self.assertFalse(dag.subgraph(['f']).is_cyclic())
+        view = dag.subgraph(['a'])
+        self.assertTrue(view.is_cyclic())
+        self.assertEqual(['d', 'e', 'c'], names_list(view.find_cycle()))
+
+    def test_is_resolved(self):
+        dag = self.create_dag()
+        view = dag.subgraph(['b'])
+        self.assertFalse(view.is_resolved())
+        dag.b.payload = 'payload-b'
+        self.assertEqual(['b', 'd'], names_list(view.unresolved_vertices()))
+        dag.d.payload = 'payload-d'
+        self.assertTrue(view.is_resolved())
+        self.assertEqual(['b', 'd'], names_list(view.resolved_vertices()))
+
+    def test_topological_order(self):
+        view = self.create_dag().subgraph(['a'])
+        self.assertEqual(['d', 'b', 'c', 'a'], names_list(view.topological_order()))
+
+    def test_materialize(self):
+        dag = self.create_dag()
+        dag.c.payload = 'payload-c'
+        new_dag = dag.subgraph(['e']).materialize()
+        self.assertEqual(['e', 'c', 'd', 'f'], names_list(new_dag.all_vertices()))
+        self.assertEqual(['c', 'f'], names_list(new_dag.e.direct_supporters()))
+        self.assertEqual(['e'], names_list(new_dag.c.direct_dependants()))
+        self.assertEqual('payload-c', new_dag.c.payload)
+
+
+class TestCompactDag(unittest.TestCase):
+
+    def create_dag(self):
+        dag = diamond_dag()
+        dag.d.payload = 'payload-d'
+        return dag
+
+    def test_vertex_slots(self):
+        with self.assertRaises(AttributeError):
+            Vertex('a', DepDag()).whatever = True
+
+    def test_compact(self):
+        compact = self.create_dag().compact()
+        self.assertIsInstance(compact, CompactDag)
+        self.assertEqual(4, len(compact))
+        self.assertIn('a', compact)
+        self.assertNotIn('e', compact)
+        self.assertEqual(['a', 'b', 'c', 'd'], names_list(compact.all_vertices()))
+        self.assertEqual(['a', 'b', 'c', 'd'], [name for name, _ in compact])
+
+    def test_getitem(self):
+        compact = self.create_dag().compact()
+        self.assertIsInstance(compact['a'], CompactVertex)
+        self.assertEqual(compact['a'], compact.a)
+        self.assertNotEqual(compact['a'], compact['b'])
+        with self.assertRaises(KeyError):
+            compact['e']
+        with self.assertRaises(AttributeError):
+            compact.e
+
+    def test_supporters(self):
+        compact = self.create_dag().compact()
+        self.assertEqual(['b', 'c'], names_list(compact.a.direct_supporters()))
+        self.assertEqual(['b', 'c', 'd', 'd'], names_list(compact.a.all_supporters()))
+        self.assertEqual(['b', 'c', 'd'], names_list(compact.a.all_supporters(unique=True)))
+
+    def test_depends_on(self):
+        compact = self.create_dag().compact()
+        with self.assertRaises(NotImplementedError):
+            compact.a.depends_on('e')
+
+    def test_is_resolved(self):
+        compact = self.create_dag().compact()
+        self.assertTrue(compact.d.is_resolved())
+        self.assertFalse(compact.b.is_resolved())
+        compact.b.payload = 'payload-b'
+        self.assertTrue(compact.b.is_resolved())
+        self.assertFalse(compact.a.is_resolved())
+
+    def test_is_cyclic(self):
+        dag = self.create_dag()
+        self.assertFalse(dag.compact().is_cyclic())
+        dag.d.depends_on('a')
+        compact = dag.compact()
+        self.assertTrue(compact.is_cyclic())
+        self.assertEqual(['a', 'b', 'd'], names_list(compact.find_cycle()))
+
+    def test_clone(self):
+        compact = self.create_dag().compact()
+        compact.a.payload = 'payload-a'
+        compact_clone = compact.clone()
+        self.assertIs(compact._targets, compact_clone._targets)
+        self.assertEqual(['b', 'c'], names_list(compact_clone.a.direct_supporters()))
+        self.assertEqual('payload-a', compact_clone.a.payload)
+
+        compact_clone.b.payload = 'payload-b'
+        compact.c.payload = 'payload-c'
+        self.assertEqual('payload-b', compact_clone.b.payload)
+        self.assertIsNone(compact.b.payload)
+        self.assertEqual('payload-c', compact.c.payload)
+        self.assertIsNone(compact_clone.c.payload)
+
+        second_clone = compact_clone.clone()
+        compact_clone.b.payload = None
+        self.assertEqual('payload-b', second_clone.b.payload)
+        self.assertEqual('payload-a', second_clone.thaw().a.payload)
+
+    def test_clone__clone_payload_method(self):
+        compact = self.create_dag().compact()
+        compact_clone = compact.clone(lambda p: p and p.upper())
+        self.assertEqual('PAYLOAD-D', compact_clone.d.payload)
+        self.assertEqual('payload-d', compact.d.payload)
+
+    def test_thaw(self):
+        dag = self.create_dag().compact().thaw()
+        self.assertEqual(['a', 'b', 'c', 'd'], names_list(dag.all_vertices()))
+        self.assertEqual(['b', 'c'], names_list(dag.a.direct_supporters()))
+        self.assertEqual('payload-d', dag.d.payload)
+        self.assertTrue(dag.d.is_resolved())
+
+    def test_transitive_reduction(self):
+        dag = self.create_dag()
+        dag.a.depends_on('d')
+        dag.e.depends_on('a', 'd')
+        reduced = dag.compact().transitive_reduction()
+        self.assertEqual([['b', 'c'], ['d'], ['d'], [], ['a']],
+                         [names_list(vertex.direct_supporters())
+                          for vertex in reduced.all_vertices()])
+        self.assertEqual('payload-d', reduced.d.payload)
+
+    def test_transitive_reduction__matches_dag(self):
+        rand = random.Random(3)
+        dag = DepDag.from_edges((idx, rand.randrange(idx + 1, 400))
+                                for idx in range(399) for _ in range(4))
+        reduced, expected = dag.compact().transitive_reduction(), dag.transitive_reduction()
+        for name, vertex in reduced:
+            self.assertEqual(names_list(expected[name].direct_supporters()),
+                             names_list(vertex.direct_supporters()))
+
+    def test_transitive_reduction__cyclic(self):
+        dag = self.create_dag()
+        dag.d.depends_on('a')
+        with self.assertRaises(CycleDetected):
+            dag.compact().transitive_reduction()
+
+
+@unittest.skipIf(scipy is None, "numpy and scipy are not installed")
+class TestCompactDagSparse(unittest.TestCase):
+
+    def create_dag(self):
+        dag = DepDag()
+        dag.a.depends_on('b', 'c', 'd')
+        dag.b.depends_on('c')
+        dag.c.depends_on('d')
+        dag.e.depends_on('a')
+        return dag
+
+    def test_to_csr_matrix(self):
+        matrix = self.create_dag().compact().to_csr_matrix()
+        self.assertEqual((5, 5), matrix.shape)
+        self.assertEqual([[0, 1, 1, 1, 0], [0, 0, 1, 0, 0], [0, 0, 0, 1, 0],
+                          [0, 0, 0, 0, 0], [1, 0, 0, 0, 0]],
+                         matrix.toarray().astype(int).tolist())
+
+    def test_reachable(self):
+        dag = self.create_dag().compact()
+        self.assertEqual({'a': ['b', 'c', 'd'], 'd': [], 'c': ['d']},
+                         dag.reachable(['a', 'd', 'c']))
+        self.assertEqual({'d': ['a', 'b', 'c', 'e']}, dag.reachable(['d'], 'dependants'))
+        with self.assertRaises(KeyError):
+            dag.reachable(['x'])
+        with self.assertRaises(ValueError):
+            dag.reachable(['a'], 'sideways')
+
+    def test_reachable__matches_all_supporters(self):
+        dag = DepDag()
+        for idx in range(1, 300):
+            dag[idx].depends_on(idx // 2, idx // 3)
+        result = dag.compact().reachable(range(0, 300, 7))
+        for name, names in result.items():
+            self.assertEqual(sorted(names_list(dag[name].all_supporters(unique=True))),
+                             sorted(names))
+
+    def test_degrees(self):
+        self.assertEqual({'a': (3, 1), 'b': (1, 1), 'c': (1, 2), 'd': (0, 2), 'e': (1, 0)},
+                         self.create_dag().compact().degrees())
+
+    def test_levels(self):
+        dag = self.create_dag()
+        dag.f.depends_on('d')
+        self.assertEqual([names_list(level) for level in dag.levels()],
+                         [names_list(level) for level in dag.compact().levels()])
+        self.assertEqual([], DepDag().compact().levels())
+
+    def test_levels__cyclic(self):
+        dag = self.create_dag()
+        dag.d.depends_on('e')
+        with self.assertRaises(CycleDetected):
+            dag.compact().levels()
+
+
+@unittest.skipIf(sys.version_info < (3, 8), "shared memory requires Python 3.8")
+class TestSharedDag(unittest.TestCase):
+
+    def create_dag(self):
+        dag = DepDag()
+        dag.a.depends_on('b', 'c')
+        dag.b.depends_on('c')
+        dag.b.payload = {'payload': 'b'}
+        dag.c.payload = 'payload-c'
+        return dag
+
+    def test_share(self):
+        with self.create_dag().share() as shared:
+            try:
+                self.assertIsInstance(shared.dag, CompactDag)
+                self.assertEqual(['b', 'c'], names_list(shared.dag.a.direct_supporters()))
+                self.assertEqual({'payload': 'b'}, shared.dag.b.payload)
+                self.assertTrue(shared.dag.b.is_resolved())
+            finally:
+                shared.unlink()
+
+    def test_attach(self):
+        shared = self.create_dag().compact().share(encode_payload=lambda payload: None)
+        try:
+            with SharedDag.attach(shared.name) as attached:
+                self.assertEqual(['b', 'c'], names_list(attached.dag.a.all_supporters(True)))
+                self.assertIsNone(attached.dag.b.payload)
+                attached.dag.a.payload = 'payload-a'
+            self.assertIsNone(shared.dag.a.payload)
+        finally:
+            shared.close()
+            shared.unlink()
+
+    def test_attach__other_process(self):
+        shared = self.create_dag().share()
+        try:
+            with ProcessPoolExecutor(1) as executor:
+                result = executor.submit(query_shared_dag, shared.name).result()
+            self.assertEqual((['b', 'c'], {'payload': 'b'}, False, True), result)
+            self.assertEqual('payload-c', shared.dag.c.payload)
+        finally:
+            shared.close()
+            shared.unlink()
+
+    def test_attach__missing(self):
+        with self.assertRaises(FileNotFoundError):
+            SharedDag.attach('depdag-test-missing-block')
+
+
+class TestStream(unittest.TestCase):
+
+    def create_dag(self):
+        dag = DepDag()
+        dag.a.depends_on('b', 'c')
+        dag.b.depends_on('c')
+        dag.new_vertex('d')
+        return dag
+
+    def assert_same_edges(self, dag, other):
+        self.assertEqual([(name, names_list(vertex.direct_supporters())) for name, vertex in dag],
+                         [(name, names_list(vertex.direct_supporters()))
+                          for name, vertex in other])
+
+    def test_edgelist(self):
+        dag = DepDag.from_stream(io.StringIO("# comment\na b\n\na c  # note\nb c\nd\n"))
+        self.assert_same_edges(self.create_dag(), dag)
+        stream = io.StringIO()
+        dag.to_stream(stream)
+        self.assertEqual("a b\na c\nb c\nd\n", stream.getvalue())
+
+    def test_edgelist__binary(self):
+        dag = DepDag.from_stream(io.BytesIO(b"a b\na c\nb c\nd\n"), fail_on_cycle=True)
+        self.assertTrue(dag.fail_on_cycle)
+        self.assert_same_edges(self.create_dag(), dag)
+
+    def test_edgelist__malformed(self):
+        with self.assertRaisesRegex(ValueError, 'line 2'):
+            DepDag.from_stream(io.StringIO("a b\na b c\n"))
+
+    def test_edgelist__unwritable_names(self):
+        for name in ('a b', 'a\tb', 'a#b', '', 'a\n'):
+            dag = DepDag()
+            dag.a.depends_on(name)
+            with self.assertRaisesRegex(ValueError, 'cannot be written'):
+                dag.to_stream(io.StringIO())
+            dag.to_stream(io.StringIO(), 'jsonl')
+
+    def test_jsonl(self):
+        stream = io.StringIO()
+        self.create_dag().to_stream(stream, 'jsonl')
+        self.assertEqual('["a", "b"]\n["a", "c"]\n["b", "c"]\n["d"]\n', stream.getvalue())
+        stream.seek(0)
+        self.assert_same_edges(self.create_dag(), DepDag.from_stream(stream, 'jsonl'))
+        dag = DepDag.from_stream(io.StringIO('[1, [2, 3]]\n\n'), format='jsonl')
+        self.assertEqual([1, (2, 3)], list(name for name, _ in dag))
+        with self.assertRaises(ValueError):
+            DepDag.from_stream(io.StringIO('["a", "b", "c"]\n'), 'jsonl')
+
+    def test_dot(self):
+        stream = io.StringIO()
+        dag = self.create_dag()
+        dag['x "y"'].depends_on('p; q')
+        dag.to_stream(stream, 'dot')
+        self.assertEqual('digraph depdag {\n  "a" -> "b";\n  "a" -> "c";\n  "b" -> "c";\n'
+                         '  "d";\n  "x \\"y\\"" -> "p; q";\n}\n', stream.getvalue())
+        stream.seek(0)
+        self.assert_same_edges(dag, DepDag.from_stream(stream, 'dot'))
+
+    def test_dot__subset(self):
+        dag = DepDag.from_stream(io.StringIO(
+            'strict digraph "deps" {  // comment\n'
+            '  rankdir=LR; node [shape=box];\n'
+            '  a -> b -> c [color=red]\n'
+            '  a -> c; d  # comment\n'
+            '}\n'), 'dot')
+        self.assert_same_edges(self.create_dag(), dag)
+        with self.assertRaisesRegex(ValueError, 'line 1'):
+            DepDag.from_stream(io.StringIO('a -> ;'), 'dot')
+
+    def test_from_stream__cycle_checked_at_end(self):
+        with self.assertRaises(CycleDetected):
+            DepDag.from_stream(io.StringIO("a b\nb c\nc a\n"), fail_on_cycle=True)
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            DepDag.from_stream(io.StringIO(), 'csv')
+        with self.assertRaises(ValueError):
+            DepDag().to_stream(io.StringIO(), 'csv')
+
+
+class TestSaveLoad(unittest.TestCase):
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.depdag')
+        os.close(handle)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def create_dag(self):
+        dag = DepDag()
+        dag.a.depends_on('b', ('tuple', 1))
+        dag.b.depends_on('c')
+        dag.new_vertex('d', 'payload-d')
+        dag.c.payload = {'payload': 'c'}
+        return dag
+
+    def test_save_load(self):
+        self.create_dag().save(self.path)
+        dag = DepDag.load(self.path, fail_on_cycle=True)
+        self.assertTrue(dag.fail_on_cycle)
+        self.assertEqual(['a', 'b', ('tuple', 1), 'c', 'd'], names_list(dag.all_vertices()))
+        self.assertEqual(['b', ('tuple', 1)], names_list(dag.a.direct_supporters()))
+        self.assertEqual(['c'], names_list(dag.b.direct_supporters()))
+        self.assertEqual({'payload': 'c'}, dag.c.payload)
+        self.assertEqual('payload-d', dag.d.payload)
+        self.assertIsNone(dag.a.payload)
+        self.assertTrue(dag.c.is_resolved())
+
+    def test_save_load__payload_codec(self):
+        self.create_dag().save(self.path, encode_payload=lambda p: str(p).encode())
+        dag = DepDag.load(self.path, decode_payload=lambda b: b.decode().upper())
+        self.assertEqual('PAYLOAD-D', dag.d.payload)
+        self.create_dag().save(self.path, encode_payload=lambda p: None)
+        dag = DepDag.load(self.path)
+        self.assertIsNone(dag.d.payload)
+
+    def test_load_compact__mmap(self):
+        self.create_dag().save(self.path)
+        compact = CompactDag.load(self.path)
+        self.assertEqual(['b', ('tuple', 1), 'c'], names_list(compact.a.all_supporters()))
+        self.assertEqual('payload-d', compact.d.payload)
+        self.assertFalse(compact.is_cyclic())
+        compact.close()
+
+    def test_save_load__empty(self):
+        DepDag().save(self.path)
+        self.assertEqual(0, len(DepDag.load(self.path)))
+
+    def test_load__not_a_depdag_file(self):
+        with open(self.path, 'wb') as file:
+            file.write(bytes(100))
+        with self.assertRaisesRegex(ValueError, 'not a depdag file'):
+            CompactDag.load(self.path)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,270 @@
+"""
+depdag execution (DepDag.execute and DepDag.arun) tests.
+"""
+
+import asyncio
+import threading
+import time
+import unittest
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+
+from depdag import DepDag, CycleDetected, NotRun, names_list
+from tests import diamond_dag
+
+
+def join_payloads(name, supporters):
+    return name + ''.join(supporters.values())
+
+
+def fail_on_b(name, supporters):
+    if name == 'b':
+        raise RuntimeError('failed on b')
+    return name
+
+
+class TestExecute(unittest.TestCase):
+
+    def test_execute(self):
+        dag = diamond_dag()
+        errors = dag.execute(join_payloads)
+        self.assertEqual({}, errors)
+        self.assertEqual('d', dag.d.payload)
+        self.assertEqual('bd', dag.b.payload)
+        self.assertEqual('abdcd', dag.a.payload)
+        self.assertTrue(dag.a.is_resolved())
+
+    def test_execute__keeps_existing_payload(self):
+        dag = diamond_dag()
+        dag.d.payload = 'D'
+        dag.execute(join_payloads)
+        self.assertEqual('D', dag.d.payload)
+        self.assertEqual('cD', dag.c.payload)
+
+    def test_execute__supporters_done_first(self):
+        dag = diamond_dag()
+        log = []
+
+        def run(name, supporters):
+            log.append(name)
+            return name
+
+        dag.execute(run, max_concurrency=1)
+        self.assertEqual(['d', 'b', 'c', 'a'], log)
+
+    def test_execute__max_concurrency(self):
+        dag = DepDag()
+        dag.top.depends_on(*range(20))
+        running, peak = set(), []
+        lock = threading.Lock()
+
+        def run(name, supporters):
+            with lock:
+                running.add(name)
+                peak.append(len(running))
+            time.sleep(0.001)
+            with lock:
+                running.discard(name)
+            return name
+
+        dag.execute(run, max_concurrency=3)
+        self.assertLessEqual(max(peak), 3)
+        self.assertTrue(dag.top.is_resolved())
+
+    def test_execute__none_result_blocks_dependants(self):
+        dag = diamond_dag()
+        errors = dag.execute(lambda name, supporters: None if name == 'c' else name)
+        self.assertEqual('b', dag.b.payload)
+        self.assertIsNone(dag.c.payload)
+        self.assertIsNone(dag.a.payload)
+        self.assertEqual(['a'], list(errors))
+        self.assertIsInstance(errors['a'], NotRun)
+        self.assertEqual(['c'], errors['a'].supporters)
+
+    def test_execute__fail_fast(self):
+        dag = diamond_dag()
+        with self.assertRaisesRegex(RuntimeError, 'failed on b'):
+            dag.execute(fail_on_b, max_concurrency=1)
+        self.assertIsNone(dag.a.payload)
+
+    def test_execute__continue_on_error(self):
+        dag = diamond_dag()
+        dag.e.depends_on('c')
+        dag.f.depends_on('a')
+        errors = dag.execute(fail_on_b, fail_fast=False)
+        self.assertEqual(['b', 'a', 'f'], list(errors))
+        self.assertIsInstance(errors['b'], RuntimeError)
+        self.assertEqual(['b'], errors['a'].supporters)
+        self.assertEqual(['a'], errors['f'].supporters)
+        self.assertRegex(str(errors['f']), "supporters not done: 'a'")
+        self.assertEqual('e', dag.e.payload)
+        self.assertIsNone(dag.a.payload)
+
+    def test_execute__cyclic(self):
+        dag = diamond_dag()
+        dag.d.depends_on('a')
+        calls = []
+        with self.assertRaises(CycleDetected) as ctx:
+            dag.execute(lambda name, supporters: calls.append(name))
+        self.assertEqual(['a', 'b', 'd'], sorted(names_list(ctx.exception.cycle)))
+        self.assertEqual([], calls)
+        dag.d.payload = 'payload-d'
+        self.assertEqual({}, dag.execute(join_payloads))
+        self.assertEqual('bpayload-d', dag.b.payload)
+
+    def test_execute__cancel(self):
+        dag = diamond_dag()
+        cancel = threading.Event()
+
+        def run(name, supporters):
+            cancel.set()
+            return name
+
+        with self.assertRaises(CancelledError):
+            dag.execute(run, max_concurrency=1, cancel=cancel)
+        self.assertEqual('d', dag.d.payload)
+        self.assertIsNone(dag.a.payload)
+
+    def test_execute__process_pool(self):
+        dag = diamond_dag()
+        with ProcessPoolExecutor(2) as executor:
+            dag.execute(join_payloads, executor=executor)
+        self.assertEqual('abdcd', dag.a.payload)
+
+
+async def ajoin_payloads(name, supporters):
+    await asyncio.sleep(0)
+    return name + ''.join(supporters.values())
+
+
+class TestArun(unittest.TestCase):
+
+    def test_arun(self):
+        dag = diamond_dag()
+        errors = asyncio.run(dag.arun(ajoin_payloads))
+        self.assertEqual({}, errors)
+        self.assertEqual('abdcd', dag.a.payload)
+        self.assertTrue(dag.a.is_resolved())
+
+    def test_arun__max_concurrency(self):
+        dag = DepDag()
+        dag.top.depends_on(*range(20))
+        running, peak = set(), []
+
+        async def run(name, supporters):
+            running.add(name)
+            peak.append(len(running))
+            await asyncio.sleep(0.001)
+            running.discard(name)
+            return name
+
+        asyncio.run(dag.arun(run, max_concurrency=4))
+        self.assertEqual(4, max(peak))
+        self.assertTrue(dag.top.is_resolved())
+
+    def test_arun__fail_fast(self):
+        dag = diamond_dag()
+
+        async def run(name, supporters):
+            return fail_on_b(name, supporters)
+
+        with self.assertRaisesRegex(RuntimeError, 'failed on b'):
+            asyncio.run(dag.arun(run, max_concurrency=1))
+        self.assertIsNone(dag.a.payload)
+
+    def test_arun__continue_on_error(self):
+        dag = diamond_dag()
+
+        async def run(name, supporters):
+            return fail_on_b(name, supporters)
+
+        errors = asyncio.run(dag.arun(run, fail_fast=False))
+        self.assertEqual(['b', 'a'], list(errors))
+        self.assertIsInstance(errors['a'], NotRun)
+        self.assertEqual('c', dag.c.payload)
+        self.assertIsNone(dag.a.payload)
+
+    def test_arun__cyclic(self):
+        dag = diamond_dag()
+        dag.b.depends_on('a')
+        with self.assertRaises(CycleDetected):
+            asyncio.run(dag.arun(ajoin_payloads))
+
+    def test_arun__awaitable_payload(self):
+        dag = diamond_dag()
+
+        async def ready():
+            return True
+
+        async def run(name, supporters):
+            return name
+
+        dag.d.payload = ready
+        asyncio.run(dag.arun(run))
+        self.assertIs(ready, dag.d.payload)
+        self.assertEqual('b', dag.b.payload)
+        self.assertTrue(asyncio.run(dag.a.ais_resolved()))
+
+    def test_ahas_payload(self):
+        dag = DepDag()
+
+        async def not_ready():
+            return False
+
+        dag.a.depends_on('b')
+        dag.a.payload = 'payload-a'
+        dag.b.payload = not_ready
+        self.assertFalse(asyncio.run(dag.b.ahas_payload()))
+        self.assertFalse(asyncio.run(dag.a.ais_resolved()))
+        with self.assertRaises(TypeError):
+            dag.b.has_payload()
+
+    def test_ais_resolved__probe_awaited_once(self):
+        dag, calls = DepDag(), []
+
+        async def ready():
+            calls.append('leaf')
+            return True
+
+        width = 2
+        for row in range(20):
+            for col in range(width):
+                dag[row, col].depends_on((row + 1, col), (row + 1, (col + 1) % width))
+                dag[row, col].payload = 'payload'
+        for col in range(width):
+            dag[20, col].depends_on('leaf')
+            dag[20, col].payload = 'payload'
+        dag.leaf.payload = ready
+        self.assertTrue(asyncio.run(dag[0, 0].ais_resolved()))
+        self.assertEqual(['leaf'], calls)
+
+    def test_ais_resolved__long_chain(self):
+        dag = DepDag()
+        for idx in range(3000):
+            dag[idx].depends_on(idx + 1)
+            dag[idx].payload = 'payload'
+
+        async def not_ready():
+            return False
+
+        dag[3000].payload = not_ready
+        self.assertFalse(asyncio.run(dag[0].ais_resolved()))
+
+    def test_ais_resolved__probe_ttl_and_batch(self):
+        batches = []
+
+        async def probe_batch(vertices):
+            batches.append(sorted(vertex.name for vertex in vertices))
+            return [True] * len(vertices)
+
+        dag = DepDag(probe_ttl=60, probe_batch=probe_batch)
+        dag.a.depends_on('b', 'c')
+        dag.a.payload = 'payload-a'
+        dag.b.payload = dag.c.payload = lambda: False
+        self.assertTrue(asyncio.run(dag.a.ais_resolved()))
+        self.assertTrue(asyncio.run(dag.b.ahas_payload()))
+        self.assertTrue(asyncio.run(dag.a.ais_resolved()))
+        self.assertEqual([['b', 'c']], batches)
+
+
+if __name__ == '__main__':
+    unittest.main()